@@ -0,0 +1,183 @@
+import asyncio
+import json
+import logging
+from typing import Any, Optional
+
+import httpx
+from pydantic import BaseModel, Field
+
+from cut_api.deduplication import (
+    ExecutionDeduplicator,
+    body_hash,
+    canonical_body,
+    execution_key,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class BatchExecutionItem(BaseModel):
+    service: str
+    # Pasted into the upstream URL, no path separators or query strings.
+    process_id: str = Field(..., regex=r"^[\w-]+$")
+    payload: dict[str, Any] = Field(default_factory=dict)
+
+
+class BatchExecutionRequest(BaseModel):
+    items: list[BatchExecutionItem] = Field(..., min_items=1)
+
+
+class BatchExecutionItemResult(BaseModel):
+    index: int
+    service: str
+    process_id: str
+    status_code: int
+    job_id: Optional[str]
+    location: Optional[str]
+    error: Optional[str]
+
+
+class BatchExecutionResponse(BaseModel):
+    results: list[BatchExecutionItemResult]
+
+
+def execution_url(routing_table: dict[str, str], item: BatchExecutionItem) -> str:
+    return (
+        f"{routing_table[item.service]}/{item.service}"
+        f"/processes/{item.process_id}/execution"
+    )
+
+
+def _job_id_from(location: Optional[str], content: bytes) -> Optional[str]:
+    # OGC Processes: the Location header points at /jobs/{jobID}
+    if location:
+        return location.rstrip("/").split("/")[-1]
+    try:
+        body = json.loads(content)
+    except ValueError:
+        return None
+    if isinstance(body, dict):
+        return body.get("jobID") or body.get("job_id")
+    return None
+
+
+async def _submit(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    routing_table: dict[str, str],
+    index: int,
+    item: BatchExecutionItem,
+    deduplicator: Optional[ExecutionDeduplicator],
+) -> BatchExecutionItemResult:
+    result = {"index": index, "service": item.service, "process_id": item.process_id}
+
+    if item.service not in routing_table:
+        return BatchExecutionItemResult(
+            **result, status_code=404, error=f"Unknown service {item.service!r}."
+        )
+
+    target_url = execution_url(routing_table, item)
+    dedup_key = None
+    if deduplicator:
+        body = json.dumps(item.payload).encode()
+        dedup_key = execution_key(target_url, body)
+        if stored := await deduplicator.reserve(dedup_key, body_hash(body)):
+            if stored.pending:
+                return BatchExecutionItemResult(
+                    **result,
+                    status_code=409,
+                    error="An identical execution is being submitted, retry shortly.",
+                )
+            return BatchExecutionItemResult(
+                **result,
+                status_code=stored.status_code,
+                job_id=_job_id_from(stored.location, stored.content.encode()),
+                location=stored.location,
+            )
+
+    async with semaphore:
+        try:
+            response = await client.post(target_url, json=item.payload)
+        except httpx.HTTPError as exc:
+            logger.warning(f"Batch item {index} could not be submitted: {exc}")
+            if dedup_key:
+                await deduplicator.release(dedup_key)
+            return BatchExecutionItemResult(
+                **result, status_code=502, error="Upstream service unavailable."
+            )
+
+    if response.is_error:
+        if dedup_key:
+            await deduplicator.release(dedup_key)
+        return BatchExecutionItemResult(
+            **result,
+            status_code=response.status_code,
+            error=response.text or response.reason_phrase,
+        )
+
+    location = response.headers.get("Location")
+    if dedup_key:
+        await deduplicator.store(
+            dedup_key,
+            body_hash(body),
+            response.status_code,
+            response.content,
+            location,
+        )
+
+    return BatchExecutionItemResult(
+        **result,
+        status_code=response.status_code,
+        job_id=_job_id_from(location, response.content),
+        location=location,
+    )
+
+
+async def execute_batch(
+    client: httpx.AsyncClient,
+    items: list[BatchExecutionItem],
+    routing_table: dict[str, str],
+    max_concurrency: int,
+    deduplicator: Optional[ExecutionDeduplicator] = None,
+) -> list[BatchExecutionItemResult]:
+    """
+    Submits all execution items to their upstream services concurrently.
+
+    At most `max_concurrency` submissions are in flight at once. Failures are
+    reported per item and never abort the rest of the batch. Items already
+    submitted within the deduplication TTL are answered from `deduplicator`.
+    With deduplication, identical items of one batch are submitted once and
+    all get that submission's result, rather than racing for the same key.
+    """
+    groups: dict[Any, list[int]] = {}
+    for index, item in enumerate(items):
+        if deduplicator:
+            identity = (
+                item.service,
+                item.process_id,
+                canonical_body(json.dumps(item.payload).encode()),
+            )
+        else:
+            identity = index
+        groups.setdefault(identity, []).append(index)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    submitted = await asyncio.gather(
+        *[
+            _submit(
+                client,
+                semaphore,
+                routing_table,
+                indices[0],
+                items[indices[0]],
+                deduplicator,
+            )
+            for indices in groups.values()
+        ]
+    )
+
+    results: list[Optional[BatchExecutionItemResult]] = [None] * len(items)
+    for indices, result in zip(groups.values(), submitted):
+        for index in indices:
+            results[index] = result.copy(update={"index": index})
+    return results
@@ -1,17 +1,51 @@
+import asyncio
 import json
 import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Optional
 
 import httpx
 import requests
 from fastapi import FastAPI, Request, Response, status
 from fastapi.responses import JSONResponse
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
 
+from cut_api.api.batch import (
+    BatchExecutionRequest,
+    BatchExecutionResponse,
+    execute_batch,
+)
+from cut_api.api.openapi import SERVICE_DOCUMENTS, OpenAPIDocsCache
+from cut_api.api.prerender import ResultPrerenderer
 from cut_api.api.responses import CutApiErrorResponse
 from cut_api.auth.tokens import AuthError
-from cut_api.config import settings
-from cut_api.dependencies import LIMITER, authorise_request
+from cut_api.caching import (
+    CachedDocument,
+    is_final_job_response,
+    is_job_path,
+    is_job_results_path,
+    job_status_url,
+    result_cache_key,
+    result_variant,
+)
+from cut_api.config import DEFAULT_PNG_SIZE, PNG_SIZES, settings
+from cut_api.deduplication import IDEMPOTENCY_KEY_HEADER, body_hash, execution_key
+from cut_api.dependencies import (
+    DEDUPLICATOR,
+    LIMITER,
+    PROFILER,
+    RESULT_CACHE,
+    authorise_admin_request,
+    authorise_request,
+    bearer_token,
+)
 from cut_api.logs import setup_logging
+from cut_api.timing import server_timing_header, start_request_timings, timed
 from cut_api.utils import geojson_to_rasterized_png
 from cut_api.api.ogc_descriptions import router as ogc_router
 from cut_api.api.routing_table import ROUTING_TABLE
@@ -24,11 +58,18 @@ app = FastAPI(
     title=settings.title,
     description=settings.description,
     version=settings.version,
+    # Served below from DOCS_CACHE, merged with the upstream services' specs.
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None,
 )
 app.include_router(ogc_router)
 
 
 def custom_openapi():
+    if app.openapi_schema:
+        return app.openapi_schema
+
     # Get the default OpenAPI schema generated by FastAPI
     openapi_schema = get_openapi(
         title=settings.title,
@@ -51,17 +92,58 @@ def custom_openapi():
         }
     }
 
-    return openapi_schema
+    app.openapi_schema = openapi_schema
+    return app.openapi_schema
 
 
 # Override the default /openapi.json endpoint
 app.openapi = custom_openapi
 
 
+def upstream_client(**kwargs) -> httpx.AsyncClient:
+    """HTTP client for requests to the upstream services."""
+    return httpx.AsyncClient(**kwargs)
+
+
+DOCS_CACHE_CONTROL = f"public, max-age={settings.openapi.cache_ttl_seconds}"
+DOCS_CACHE = OpenAPIDocsCache(
+    gateway_spec=custom_openapi,
+    routing_table=ROUTING_TABLE,
+    ttl_seconds=settings.openapi.cache_ttl_seconds,
+    timeout_seconds=settings.openapi.fetch_timeout_seconds,
+    client_factory=upstream_client,
+)
+
+
+@app.on_event("startup")
+async def warm_docs_cache():
+    DOCS_CACHE.refresh_in_background()
+
+
+@app.get("/openapi.json", include_in_schema=False)
+async def openapi_json(request: Request):
+    document = await DOCS_CACHE.get_merged()
+    return document.to_response(request, DOCS_CACHE_CONTROL)
+
+
+@app.get("/docs", include_in_schema=False)
+async def swagger_ui():
+    return get_swagger_ui_html(openapi_url="openapi.json", title=settings.title)
+
+
+@app.get("/redoc", include_in_schema=False)
+async def redoc():
+    return get_redoc_html(openapi_url="openapi.json", title=settings.title)
+
+
 CORS_HEADERS = {
     "Access-Control-Allow-Origin": "*",  # Replace with your desired CORS settings
     "Access-Control-Allow-Methods": "OPTIONS, GET, POST",
-    "Access-Control-Allow-Headers": "Content-Type, x-requested-with, Authorization, Origin, Content-Type, Accept",
+    "Access-Control-Allow-Headers": (
+        "Content-Type, x-requested-with, Authorization, Origin, Content-Type, Accept, "
+        f"{IDEMPOTENCY_KEY_HEADER}"
+    ),
+    "Access-Control-Expose-Headers": "ETag, Location",
     "Content-Type": "application/json",
 }
 
@@ -73,6 +155,12 @@ async def health_check():
 
 VALID_RESULT_FORMATS = ["png", "geojson"]
 
+# Responses of finished jobs are immutable, clients may keep them as long as
+# the result cache does. "private" as they are only served to authorised users.
+RESULT_CACHE_CONTROL = (
+    f"private, max-age={settings.cache.ttl_days * 24 * 60 * 60}, immutable"
+)
+
 
 async def register_request_event(
     token: str,
@@ -85,9 +173,10 @@ async def register_request_event(
             "Content-Type": "application/json",
         }
         logger.info("Sending request to register request_event...")
-        response = requests.post(
-            f"{request_logging_url}?endpoint_called={endpoint}", headers=headers
-        )
+        with timed("event_log"):
+            response = requests.post(
+                f"{request_logging_url}?endpoint_called={endpoint}", headers=headers
+            )
         if response.status_code == 200:
             logger.info("Request was successful!")
         else:
@@ -96,21 +185,36 @@ async def register_request_event(
         logger.warning(f"An error occurred: {str(e)}")
 
 
-async def prepare_response(desired_output_format, response):
-    response_content = response.content
-
+async def convert_result(
+    results: dict,
+    desired_output_format: str,
+    size: str = DEFAULT_PNG_SIZE,
+    executor: Optional[Executor] = None,
+) -> Optional[bytes]:
+    """Returns the results body with its geojson converted, None if nothing to convert."""
     # TODO standardise response in calculation APIs for when it returns from cache
     # with a post request and from when it returns from get request with task_id
     # as currently in one case (task_id) the root key is "result" and the other case
     # (from cache) it is "result_format" and "geojson"
-    if result := response.json().get("result"):
+    if result := results.get("result"):
         if desired_output_format != "geojson":
-            converted_from_geojson = await convert_output(
-                result.pop("geojson"), desired_output_format
-            )
+            result = dict(result)
+            with timed("convert"):
+                converted_from_geojson = await convert_output(
+                    result.pop("geojson"), desired_output_format, size, executor
+                )
             result[desired_output_format.lower()] = converted_from_geojson
-            response_content = json.dumps({"result": result}).encode()
-            response.headers["content-length"] = str(len(response_content))
+            with timed("serialize"):
+                return json.dumps({"result": result}).encode()
+    return None
+
+
+async def prepare_response(desired_output_format, response, size=DEFAULT_PNG_SIZE):
+    response_content = response.content
+
+    if converted := await convert_result(response.json(), desired_output_format, size):
+        response_content = converted
+        response.headers["content-length"] = str(len(response_content))
 
     return Response(
         content=response_content,
@@ -119,29 +223,78 @@ async def prepare_response(desired_output_format, response):
     )
 
 
-async def convert_output(geojson, to_format):
+# pyplot keeps global state, renders run one at a time off the event loop.
+RENDER_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="render")
+
+# Background pre-renders get their own process, with its own pyplot state, at a
+# lower CPU priority, so they never queue in front of on-demand renders.
+PRERENDER_EXECUTOR = (
+    ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=os.nice,
+        initargs=(10,),
+    )
+    if settings.prerender.enabled
+    else None
+)
+
+
+async def convert_output(geojson, to_format, size=DEFAULT_PNG_SIZE, executor=None):
     if to_format == "png":
-        return geojson_to_rasterized_png(geojson)
+        return await asyncio.get_running_loop().run_in_executor(
+            executor or RENDER_EXECUTOR,
+            geojson_to_rasterized_png,
+            geojson,
+            PNG_SIZES[size],
+        )
     raise Exception("Format not allowed.")
 
 
+async def job_status_seen_final(target_url: str) -> bool:
+    """
+    Results are only cached once the job's status was seen as final, which is
+    when the status document itself was cached.
+    """
+    if not is_job_results_path(target_url):
+        return True
+    return bool(await RESULT_CACHE.get(result_cache_key(job_status_url(target_url))))
+
+
+PRERENDERER = (
+    ResultPrerenderer(
+        result_cache=RESULT_CACHE,
+        render=partial(convert_result, executor=PRERENDER_EXECUTOR),
+        sizes=settings.prerender.sizes,
+        timeout_seconds=settings.prerender.timeout_seconds,
+        client_factory=upstream_client,
+    )
+    if RESULT_CACHE and settings.prerender.enabled
+    else None
+)
+
+
 async def forward_request(request: Request, target_url: str):
-    if not await LIMITER.can_pass_request(request):
+    with timed("limiter"):
+        can_pass = await LIMITER.can_pass_request(request)
+    if not can_pass:
         return JSONResponse(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             content=CutApiErrorResponse(message="Request limit reached.").dict(),
         )
 
-    async with httpx.AsyncClient() as client:
+    async with upstream_client() as client:
 
-        response_headers = CORS_HEADERS
+        response_headers = dict(CORS_HEADERS)
 
         # Authorize requests to job stati, job results and job execution.
+        user = None
         if any(
             endpoint in target_url for endpoint in ["execution", "jobs"]
         ):
             try:
-                token = authorise_request(request)
+                with timed("auth"):
+                    user = authorise_request(request)
             except AuthError as exc:
                 return JSONResponse(
                     status_code=status.HTTP_401_UNAUTHORIZED,
@@ -149,35 +302,144 @@ async def forward_request(request: Request, target_url: str):
                     headers={"WWW-Authenticate": "Bearer"},
                 )
 
-            await register_request_event(token, target_url)
+            await register_request_event(bearer_token(request), target_url)
 
         if request.method == "POST":
             request_body = await request.body()
             request_json = json.loads(request_body.decode())
-            response = await client.request(
-                request.method, target_url, json=request_json
-            )
+
+            # Identical executions within the TTL get the earlier job back
+            # instead of starting a new simulation.
+            dedup_key = None
+            if DEDUPLICATOR and "execution" in target_url:
+                request_body_hash = body_hash(request_body)
+                dedup_key = execution_key(
+                    target_url,
+                    request_body,
+                    request.headers.get(IDEMPOTENCY_KEY_HEADER),
+                    user.id if user else None,
+                )
+                if stored := await DEDUPLICATOR.reserve(dedup_key, request_body_hash):
+                    if stored.body_hash != request_body_hash:
+                        return JSONResponse(
+                            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            content=CutApiErrorResponse(
+                                message=f"{IDEMPOTENCY_KEY_HEADER} was already used "
+                                "with a different request body."
+                            ).dict(),
+                            headers=response_headers,
+                        )
+                    if stored.pending:
+                        return JSONResponse(
+                            status_code=status.HTTP_409_CONFLICT,
+                            content=CutApiErrorResponse(
+                                message="An identical execution is being submitted, "
+                                "retry shortly."
+                            ).dict(),
+                            headers={**response_headers, "Retry-After": "1"},
+                        )
+                    logger.info(f"Replaying deduplicated execution for {target_url}")
+                    if stored.location:
+                        response_headers["Location"] = stored.location
+                    return Response(
+                        content=stored.content,
+                        status_code=stored.status_code,
+                        headers=response_headers,
+                    )
+
+            try:
+                with timed("upstream"):
+                    response = await client.request(
+                        request.method, target_url, json=request_json
+                    )
+            except Exception:
+                if dedup_key:
+                    await DEDUPLICATOR.release(dedup_key)
+                raise
             # OGC Processes Requirement 34 | /req/core/process-execute-success-async  set location header
             if location_header := response.headers.get("Location", None):
                 response_headers["Location"] = location_header
 
-        elif request.method == "GET":
-            response = await client.request(request.method, target_url)
+            if dedup_key:
+                if response.is_success:
+                    await DEDUPLICATOR.store(
+                        dedup_key,
+                        request_body_hash,
+                        response.status_code,
+                        response.content,
+                        location_header,
+                    )
+                else:
+                    await DEDUPLICATOR.release(dedup_key)
 
+        elif request.method == "GET":
+            desired_result_format = None
             if "results" in target_url:
                 # get result and format to desired format.
-                if desired_result_format := request.query_params.get("result_format"):
-                    return (
-                        JSONResponse(
-                            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                            content=CutApiErrorResponse(
-                                message=f"Result format key. Valid options are {VALID_RESULT_FORMATS} "
-                            ).dict(),
-                        )
-                        if desired_result_format.lower() not in VALID_RESULT_FORMATS
-                        else await prepare_response(desired_result_format, response)
+                desired_result_format = request.query_params.get("result_format")
+                if (
+                    desired_result_format
+                    and desired_result_format.lower() not in VALID_RESULT_FORMATS
+                ):
+                    return JSONResponse(
+                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        content=CutApiErrorResponse(
+                            message=f"Result format key. Valid options are {VALID_RESULT_FORMATS} "
+                        ).dict(),
+                    )
+
+            size = None
+            if desired_result_format and desired_result_format.lower() == "png":
+                size = request.query_params.get("size", DEFAULT_PNG_SIZE)
+                if size not in PNG_SIZES:
+                    return JSONResponse(
+                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        content=CutApiErrorResponse(
+                            message=f"Invalid size. Valid options are {list(PNG_SIZES)}"
+                        ).dict(),
                     )
 
+            # Finished jobs never change, they are served from the result cache.
+            cache_key = None
+            if RESULT_CACHE and is_job_path(target_url):
+                cache_key = result_cache_key(
+                    target_url, result_variant(desired_result_format, size)
+                )
+                if cached := await RESULT_CACHE.get(cache_key):
+                    return cached.to_response(
+                        request, RESULT_CACHE_CONTROL, response_headers
+                    )
+
+            with timed("upstream"):
+                response = await client.request(request.method, target_url)
+
+            if PRERENDERER:
+                PRERENDERER.on_job_response(target_url, response)
+
+            if desired_result_format:
+                prepared = await prepare_response(
+                    desired_result_format, response, size or DEFAULT_PNG_SIZE
+                )
+                content, media_type = prepared.body, "application/json"
+            else:
+                prepared = None
+                content = response.content
+                media_type = response.headers.get("content-type", "application/json")
+
+            if (
+                cache_key
+                and is_final_job_response(target_url, response.status_code, content)
+                and await job_status_seen_final(target_url)
+            ):
+                document = CachedDocument.from_content(content, media_type)
+                await RESULT_CACHE.set(cache_key, document)
+                return document.to_response(
+                    request, RESULT_CACHE_CONTROL, response_headers
+                )
+
+            if prepared:
+                return prepared
+
             # If request is to docs endpoints, doctype is HTML
             if any(
                     endpoint in target_url for endpoint in ["docs", "redoc"]
@@ -191,26 +453,145 @@ async def forward_request(request: Request, target_url: str):
         )
 
 
+@app.options("/batch/execution", include_in_schema=False)
+async def batch_execution_preflight():
+    return Response(status_code=200, headers=CORS_HEADERS)
+
+
+@app.post("/batch/execution", tags=["batch"], response_model=BatchExecutionResponse)
+async def batch_execution(request: Request, batch: BatchExecutionRequest):
+    """
+    Submits many process executions, for one or more services, in one request.
+
+    The request is authorised, rate limited (one hit per item) and logged once,
+    items are submitted upstream concurrently and results are reported per item.
+    """
+    if len(batch.items) > settings.batch.max_items:
+        return JSONResponse(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            content=CutApiErrorResponse(
+                message=f"A batch can contain at most {settings.batch.max_items} items."
+            ).dict(),
+        )
+
+    # Each item costs one request, a batch above the per-minute rate could never
+    # pass the limiter, so retrying it after a 429 would be pointless.
+    if len(batch.items) > LIMITER.default_rate_per_minute:
+        return JSONResponse(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            content=CutApiErrorResponse(
+                message=(
+                    f"A batch of {len(batch.items)} items exceeds the allowance of "
+                    f"{LIMITER.default_rate_per_minute} requests per minute."
+                )
+            ).dict(),
+        )
+
+    with timed("limiter"):
+        can_pass = await LIMITER.can_pass_request(request, cost=len(batch.items))
+    if not can_pass:
+        return JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content=CutApiErrorResponse(message="Request limit reached.").dict(),
+        )
+
+    try:
+        with timed("auth"):
+            authorise_request(request)
+    except AuthError as exc:
+        return JSONResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            content=CutApiErrorResponse(message=exc.message).dict(),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    await register_request_event(bearer_token(request), str(request.url))
+
+    async with upstream_client(timeout=settings.batch.timeout_seconds) as client:
+        with timed("upstream"):
+            results = await execute_batch(
+                client,
+                batch.items,
+                ROUTING_TABLE,
+                max_concurrency=settings.batch.max_concurrency,
+                deduplicator=DEDUPLICATOR,
+            )
+
+    with timed("serialize"):
+        return JSONResponse(
+            content=BatchExecutionResponse(results=results).dict(),
+            headers=dict(CORS_HEADERS),
+        )
+
+
+@app.get("/admin/profiles", tags=["admin"])
+async def list_profiles(request: Request):
+    """Lists the captured profiles of slow requests, newest last."""
+    if error_response := _admin_error_response(request):
+        return error_response
+    profiles = PROFILER.profiles if PROFILER else []
+    return [profile.dict(exclude={"stats"}) for profile in profiles]
+
+
+@app.get("/admin/profiles/{profile_id}", tags=["admin"])
+async def download_profile(request: Request, profile_id: str):
+    """Downloads a captured profile in pstats format, e.g. for snakeviz."""
+    if error_response := _admin_error_response(request):
+        return error_response
+    if not PROFILER or not (profile := PROFILER.get(profile_id)):
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content=CutApiErrorResponse(message="Profile not found.").dict(),
+        )
+    return Response(
+        content=profile.stats,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{profile.id}.prof"'},
+    )
+
+
+def _admin_error_response(request: Request) -> Optional[JSONResponse]:
+    try:
+        authorise_admin_request(request)
+    except AuthError as exc:
+        return JSONResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            content=CutApiErrorResponse(message=exc.message).dict(),
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return None
+
+
 @app.middleware("http")
 async def custom_reverse_proxy(request: Request, call_next):
     # TODO this is a temp fix due to the nginx configs, in an ideal scenario
     # cut-public-api should be served at root, but is currently served at /cut-public-api
 
-    request_path = request.url.path.replace("/cut-public-api", "")
-    logger.info(f"Request path is {request_path}")
+    with timed("route"):
+        request_path = request.url.path.replace("/cut-public-api", "")
+        logger.info(f"Request path is {request_path}")
+        target_server_name = request_path.split("/")[1]
+        target_server_url = ROUTING_TABLE.get(target_server_name)
 
     # OGC description requests
     if request.method in ["/", "/processes", "/conformance"]:
         return await call_next(request)
 
-    target_server_name = request_path.split("/")[1]
     logger.info(f"target server name is {target_server_name}")
 
-    if target_server_url := ROUTING_TABLE.get(target_server_name):
+    if target_server_url:
         # Handle preflight requests.
         if request.method == "OPTIONS":
             return Response(status_code=200, headers=CORS_HEADERS)
 
+        # Upstream documentation is served from the cache.
+        service_document = request_path.removeprefix(f"/{target_server_name}/")
+        if request.method == "GET" and service_document in SERVICE_DOCUMENTS:
+            if document := await DOCS_CACHE.get_service_document(
+                target_server_name, service_document
+            ):
+                return document.to_response(request, DOCS_CACHE_CONTROL)
+
         logger.info(f"Target server URL is {target_server_url}")
         target_url = f"{target_server_url}{request_path}"
         logger.info(f"Target endpoint is {target_url}")
@@ -219,6 +600,25 @@ async def custom_reverse_proxy(request: Request, call_next):
     return await call_next(request)
 
 
+# Registered last, so it wraps the reverse proxy and times the whole request.
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    timings = start_request_timings()
+    profile = PROFILER.start() if PROFILER else None
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        if profile:
+            PROFILER.finish(profile, request.method, request.url.path, duration_ms)
+
+    if settings.profiling.server_timing_enabled:
+        timings["total"] = duration_ms
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
+
 if __name__ == "__main__":
     import uvicorn
 
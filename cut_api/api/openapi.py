@@ -0,0 +1,175 @@
+import asyncio
+import copy
+import json
+import logging
+import time
+from typing import Any, Callable, Optional
+
+import httpx
+
+from cut_api.caching import CachedDocument
+
+logger = logging.getLogger(__name__)
+
+# Upstream documentation served from the cache, relative to /{service}/
+SERVICE_DOCUMENTS = {
+    "openapi.json": "application/json",
+    "docs": "text/html; charset=utf-8",
+    "redoc": "text/html; charset=utf-8",
+}
+
+HTTP_METHODS = ["get", "put", "post", "delete", "options", "head", "patch", "trace"]
+
+
+def _prefix_refs(node: Any, service: str) -> Any:
+    if isinstance(node, dict):
+        return {
+            key: (
+                _prefixed_ref(value, service)
+                if key == "$ref" and isinstance(value, str)
+                else _prefix_refs(value, service)
+            )
+            for key, value in node.items()
+        }
+    if isinstance(node, list):
+        return [_prefix_refs(value, service) for value in node]
+    return node
+
+
+def _prefixed_ref(ref: str, service: str) -> str:
+    # "#/components/schemas/Job" -> "#/components/schemas/noise.Job"
+    if not ref.startswith("#/components/"):
+        return ref
+    base, name = ref.rsplit("/", 1)
+    return f"{base}/{service}.{name}"
+
+
+def merge_openapi_specs(
+    gateway_spec: dict[str, Any], service_specs: dict[str, dict[str, Any]]
+) -> dict[str, Any]:
+    """
+    Merges the upstream services' specs into the gateway's own spec.
+
+    Paths are prefixed with `/{service}` as they are exposed by the gateway,
+    components are namespaced as `{service}.{name}` so that equally named
+    schemas of different services don't collide, and operations are tagged and
+    their operationIds prefixed with the service name.
+    """
+    merged = copy.deepcopy(gateway_spec)
+    paths = merged.setdefault("paths", {})
+    components = merged.setdefault("components", {})
+
+    for service, spec in service_specs.items():
+        spec = _prefix_refs(spec, service)
+
+        for path, path_item in spec.get("paths", {}).items():
+            if not path.startswith(f"/{service}/"):
+                path = f"/{service}{path}"
+            for method, operation in path_item.items():
+                if method not in HTTP_METHODS:
+                    continue
+                operation["tags"] = [service]
+                if operation_id := operation.get("operationId"):
+                    operation["operationId"] = f"{service}_{operation_id}"
+            paths[path] = path_item
+
+        for component_type, items in spec.get("components", {}).items():
+            target = components.setdefault(component_type, {})
+            for name, component in items.items():
+                target[f"{service}.{name}"] = component
+
+    return merged
+
+
+class OpenAPIDocsCache:
+    """
+    Caches the merged gateway OpenAPI document and the upstream services' docs.
+
+    Documents are fetched from all upstreams concurrently and refreshed in the
+    background once older than `ttl_seconds`. A stale document keeps being
+    served while it is refreshed, and the last good copy of an upstream's
+    document is kept when that upstream can't be reached.
+    """
+
+    def __init__(
+        self,
+        gateway_spec: Callable[[], dict[str, Any]],
+        routing_table: dict[str, str],
+        ttl_seconds: int,
+        timeout_seconds: float,
+        client_factory: Callable[..., httpx.AsyncClient] = httpx.AsyncClient,
+    ):
+        self.gateway_spec = gateway_spec
+        self.routing_table = routing_table
+        self.ttl_seconds = ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self.client_factory = client_factory
+        self.merged: Optional[CachedDocument] = None
+        self.service_documents: dict[tuple[str, str], CachedDocument] = {}
+        self._service_specs: dict[str, dict[str, Any]] = {}
+        self._refreshed_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def _fetch(
+        self, client: httpx.AsyncClient, service: str, document: str
+    ) -> Optional[bytes]:
+        url = f"{self.routing_table[service]}/{service}/{document}"
+        try:
+            response = await client.get(url)
+            response.raise_for_status()
+            return response.content
+        except httpx.HTTPError as exc:
+            logger.warning(f"Could not fetch {url} for the docs cache: {exc}")
+            return None
+
+    async def refresh(self) -> None:
+        targets = [
+            (service, document)
+            for service in self.routing_table
+            for document in SERVICE_DOCUMENTS
+        ]
+        async with self.client_factory(timeout=self.timeout_seconds) as client:
+            contents = await asyncio.gather(
+                *[self._fetch(client, *target) for target in targets]
+            )
+
+        for (service, document), content in zip(targets, contents):
+            if content is None:
+                continue
+            if document == "openapi.json":
+                try:
+                    self._service_specs[service] = json.loads(content)
+                except ValueError:
+                    logger.warning(f"{service} returned an invalid OpenAPI document.")
+                    continue
+            self.service_documents[(service, document)] = CachedDocument.from_content(
+                content, SERVICE_DOCUMENTS[document]
+            )
+
+        merged = merge_openapi_specs(self.gateway_spec(), self._service_specs)
+        self.merged = CachedDocument.from_content(
+            json.dumps(merged).encode(), "application/json"
+        )
+        self._refreshed_at = time.monotonic()
+
+    def refresh_in_background(self) -> None:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh())
+
+    async def _ensure_fresh(self) -> None:
+        if self.merged is None:
+            # Nothing to serve yet, the very first requests have to wait.
+            self.refresh_in_background()
+            await asyncio.shield(self._refresh_task)
+        elif time.monotonic() - self._refreshed_at > self.ttl_seconds:
+            self.refresh_in_background()
+
+    async def get_merged(self) -> CachedDocument:
+        await self._ensure_fresh()
+        return self.merged
+
+    async def get_service_document(
+        self, service: str, document: str
+    ) -> Optional[CachedDocument]:
+        await self._ensure_fresh()
+        return self.service_documents.get((service, document))
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+
+from cut_api.caching import (
+    CachedDocument,
+    ResultCache,
+    is_final_job_response,
+    result_cache_key,
+    result_variant,
+)
+
+logger = logging.getLogger(__name__)
+
+# Converts an upstream results body to the given format and size.
+RenderResult = Callable[[dict[str, Any], str, str], Awaitable[Optional[bytes]]]
+
+
+class ResultPrerenderer:
+    """
+    Renders the PNG pyramid of a job's results as soon as the job is seen to
+    have succeeded, and stores every size in the result cache, so that the
+    first client asking for `result_format=png` doesn't pay the render latency.
+
+    Sizes already in the cache, e.g. rendered on demand, are not rendered again.
+    `render` should not compete with on-demand renders, see `PRERENDER_EXECUTOR`.
+    """
+
+    def __init__(
+        self,
+        result_cache: ResultCache,
+        render: RenderResult,
+        sizes: list[str],
+        timeout_seconds: float,
+        client_factory: Callable[..., httpx.AsyncClient] = httpx.AsyncClient,
+    ):
+        self.result_cache = result_cache
+        self.render = render
+        self.sizes = sizes
+        self.timeout_seconds = timeout_seconds
+        self.client_factory = client_factory
+        self._pending: set[str] = set()
+        # Keep references, the event loop only holds weak ones to tasks.
+        self._tasks: set[asyncio.Task] = set()
+
+    def on_job_response(self, target_url: str, response: httpx.Response) -> None:
+        """Schedules the pre-rendering when `response` is a successful job status."""
+        if not is_final_job_response(
+            target_url, response.status_code, response.content
+        ):
+            return
+        if target_url.rstrip("/").endswith("/results"):
+            return
+        try:
+            job_status = json.loads(response.content).get("status")
+        except ValueError:
+            return
+        if job_status == "successful":
+            self.schedule(f"{target_url.rstrip('/')}/results")
+
+    def schedule(self, results_url: str) -> None:
+        if results_url in self._pending:
+            return
+        self._pending.add(results_url)
+        task = asyncio.create_task(self._prerender(results_url))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _prerender(self, results_url: str) -> None:
+        try:
+            async with self.client_factory(timeout=self.timeout_seconds) as client:
+                response = await client.get(results_url)
+            if not is_final_job_response(
+                results_url, response.status_code, response.content
+            ):
+                return
+
+            await self.result_cache.set(
+                result_cache_key(results_url),
+                CachedDocument.from_content(
+                    response.content,
+                    response.headers.get("content-type", "application/json"),
+                ),
+            )
+
+            results = response.json()
+            rendered = []
+            for size in self.sizes:
+                key = result_cache_key(results_url, result_variant("png", size))
+                if await self.result_cache.get(key):
+                    continue
+                if content := await self.render(results, "png", size):
+                    await self.result_cache.set(
+                        key, CachedDocument.from_content(content, "application/json")
+                    )
+                    rendered.append(size)
+            logger.info(f"Pre-rendered {rendered} PNGs of {results_url}")
+        except Exception:
+            logger.warning(f"Could not pre-render {results_url}", exc_info=True)
+        finally:
+            self._pending.discard(results_url)
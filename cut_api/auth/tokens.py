@@ -38,6 +38,12 @@ class AuthErrorNotAnAccessToken(AuthError):
         self.message = "Refresh tokens cannot be used to authenticate."
 
 
+class AuthErrorNotAnAdmin(AuthError):
+    def __init__(self):
+        super().__init__()
+        self.message = "Admin privileges required."
+
+
 class ApiUser(BaseModelStrict):
     id: str
     email: str
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import logging
+import re
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+FINAL_JOB_STATUSES = ["successful", "failed", "dismissed"]
+
+_JOB_STATUS_PATH = re.compile(r"/jobs/[^/?]+/?$")
+_JOB_RESULTS_PATH = re.compile(r"/jobs/[^/?]+/results/?$")
+
+
+class CachedDocument(BaseModel):
+    content: bytes
+    media_type: str
+    etag: str
+
+    @classmethod
+    def from_content(cls, content: bytes, media_type: str) -> "CachedDocument":
+        return cls(
+            content=content,
+            media_type=media_type,
+            etag=f'"{hashlib.sha256(content).hexdigest()}"',
+        )
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        etags = [etag.strip().removeprefix("W/") for etag in if_none_match.split(",")]
+        return "*" in etags or self.etag in etags
+
+    def to_response(
+        self,
+        request: Request,
+        cache_control: str,
+        headers: Optional[dict[str, str]] = None,
+    ) -> Response:
+        headers = {**(headers or {}), "ETag": self.etag, "Cache-Control": cache_control}
+        headers["Content-Type"] = self.media_type
+        if self.matches(request.headers.get("if-none-match")):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=self.content, headers=headers)
+
+
+def is_job_path(target_url: str) -> bool:
+    path = target_url.split("?")[0]
+    return bool(_JOB_STATUS_PATH.search(path) or _JOB_RESULTS_PATH.search(path))
+
+
+def is_job_results_path(target_url: str) -> bool:
+    return bool(_JOB_RESULTS_PATH.search(target_url.split("?")[0]))
+
+
+def job_status_url(results_url: str) -> str:
+    """The status URL of the job whose results are at `results_url`."""
+    return results_url.split("?")[0].rstrip("/").removesuffix("/results")
+
+
+def is_final_job_response(target_url: str, status_code: int, content: bytes) -> bool:
+    """
+    Returns whether a job status or results response can no longer change.
+
+    A job status is final once it reports one of `FINAL_JOB_STATUSES`, results
+    once they contain the `result` of the job. Callers should also make sure
+    the job's status was seen as final before caching its results.
+    """
+    if status_code != status.HTTP_200_OK:
+        return False
+    path = target_url.split("?")[0]
+    if not (_JOB_RESULTS_PATH.search(path) or _JOB_STATUS_PATH.search(path)):
+        return False
+    try:
+        body = json.loads(content)
+    except ValueError:
+        return False
+    if not isinstance(body, dict):
+        return False
+    if _JOB_RESULTS_PATH.search(path):
+        return "result" in body
+    return body.get("status") in FINAL_JOB_STATUSES
+
+
+def result_variant(
+    result_format: Optional[str], size: Optional[str] = None
+) -> Optional[str]:
+    """Names a converted rendition of a job result, e.g. "png:thumbnail"."""
+    if not result_format:
+        return None
+    return f"{result_format.lower()}:{size}" if size else result_format.lower()
+
+
+def result_cache_key(target_url: str, variant: Optional[str] = None) -> str:
+    """Cache key of a job response, `variant` e.g. the requested result format."""
+    return hashlib.sha256(f"{target_url}\n{variant or ''}".encode()).hexdigest()
+
+
+class MemoryLRU:
+    """Least recently used cache bounded by the total size of its contents."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items: OrderedDict[str, CachedDocument] = OrderedDict()
+
+    def get(self, key: str) -> Optional[CachedDocument]:
+        if (document := self._items.get(key)) is not None:
+            self._items.move_to_end(key)
+        return document
+
+    def set(self, key: str, document: CachedDocument) -> None:
+        if len(document.content) > self.max_bytes:
+            return
+        if (previous := self._items.pop(key, None)) is not None:
+            self.size -= len(previous.content)
+        self._items[key] = document
+        self.size += len(document.content)
+        while self.size > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self.size -= len(evicted.content)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class ResultCache:
+    """
+    Two tier cache for immutable job responses: a per-worker in-memory LRU in
+    front of Redis, which is shared by all workers.
+
+    Redis errors are logged and treated as a miss.
+    """
+
+    def __init__(
+        self,
+        storage_url: str,
+        ttl_seconds: int,
+        memory_max_bytes: int,
+        key_prefix: str = "job_results",
+    ):
+        self.redis = aioredis.from_url(storage_url)
+        self.ttl_seconds = ttl_seconds
+        self.memory = MemoryLRU(memory_max_bytes)
+        self.key_prefix = key_prefix
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.key_prefix}:{key}"
+
+    async def get(self, key: str) -> Optional[CachedDocument]:
+        if document := self.memory.get(key):
+            return document
+        try:
+            stored = await self.redis.hgetall(self._redis_key(key))
+        except RedisError as exc:
+            logger.warning(f"Could not read job result cache: {exc}")
+            return None
+        if not stored:
+            return None
+        document = CachedDocument(
+            content=stored[b"content"],
+            media_type=stored[b"media_type"].decode(),
+            etag=stored[b"etag"].decode(),
+        )
+        self.memory.set(key, document)
+        return document
+
+    async def set(self, key: str, document: CachedDocument) -> None:
+        self.memory.set(key, document)
+        redis_key = self._redis_key(key)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(redis_key, mapping=document.dict())
+                pipe.expire(redis_key, self.ttl_seconds)
+                await pipe.execute()
+        except RedisError as exc:
+            logger.warning(f"Could not store job result cache: {exc}")
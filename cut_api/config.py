@@ -1,6 +1,10 @@
 from typing import Literal, Optional
 
-from pydantic import BaseSettings, Field
+from pydantic import BaseSettings, Field, validator
+
+# Resolutions (dpi of the 10x10 inch figure) results can be rendered at.
+PNG_SIZES = {"thumbnail": 20, "medium": 50, "full": 100}
+DEFAULT_PNG_SIZE = "full"
 
 
 class RateLimiter(BaseSettings):
@@ -40,6 +44,67 @@ class Auth(BaseSettings):
     auth_docs: str = Field(..., env="AUTH_DOCS_URL", min_length=1)
 
 
+class UploadLimits(BaseSettings):
+    geojson_max_bytes: int = Field(200 * 1024 * 1024, env="GEOJSON_UPLOAD_MAX_BYTES")
+    geojson_max_features: int = Field(500_000, env="GEOJSON_UPLOAD_MAX_FEATURES")
+    geojson_max_feature_size: int = Field(
+        32 * 1024 * 1024, env="GEOJSON_UPLOAD_MAX_FEATURE_SIZE"
+    )
+    chunk_size: int = Field(1024 * 1024, env="UPLOAD_CHUNK_SIZE_BYTES")
+
+
+class BatchExecution(BaseSettings):
+    max_items: int = Field(50, env="BATCH_EXECUTION_MAX_ITEMS")
+    max_concurrency: int = Field(10, env="BATCH_EXECUTION_MAX_CONCURRENCY")
+    timeout_seconds: float = Field(30, env="BATCH_EXECUTION_TIMEOUT_SECONDS")
+
+
+class ExecutionDeduplication(BaseSettings):
+    enabled: bool = Field(True, env="EXECUTION_DEDUP_ENABLED")
+    ttl_seconds: int = Field(3600, env="EXECUTION_DEDUP_TTL_SECONDS")
+    # How long a duplicate waits on a submission that is still in flight.
+    pending_ttl_seconds: int = Field(60, env="EXECUTION_DEDUP_PENDING_TTL_SECONDS")
+
+
+class Profiling(BaseSettings):
+    server_timing_enabled: bool = Field(False, env="SERVER_TIMING_ENABLED")
+    profiler_enabled: bool = Field(False, env="PROFILER_ENABLED")
+    profiler_sample_rate: float = Field(0.1, env="PROFILER_SAMPLE_RATE", ge=0, le=1)
+    slow_request_threshold_ms: float = Field(
+        1000, env="PROFILER_SLOW_REQUEST_THRESHOLD_MS"
+    )
+    max_profiles: int = Field(20, env="PROFILER_MAX_PROFILES")
+    admin_emails: list[str] = Field([], env="PROFILER_ADMIN_EMAILS")
+
+
+class OpenAPIDocs(BaseSettings):
+    cache_ttl_seconds: int = Field(300, env="OPENAPI_CACHE_TTL_SECONDS")
+    fetch_timeout_seconds: float = Field(10, env="OPENAPI_FETCH_TIMEOUT_SECONDS")
+
+
+class ResultCaching(BaseSettings):
+    enabled: bool = Field(True, env="RESULT_CACHE_ENABLED")
+    memory_max_bytes: int = Field(
+        256 * 1024 * 1024, env="RESULT_CACHE_MEMORY_MAX_BYTES"
+    )
+
+
+class ResultPrerendering(BaseSettings):
+    enabled: bool = Field(False, env="RESULT_PRERENDER_ENABLED")
+    sizes: list[str] = Field(
+        ["thumbnail", "medium", "full"], env="RESULT_PRERENDER_SIZES"
+    )
+    timeout_seconds: float = Field(60, env="RESULT_PRERENDER_TIMEOUT_SECONDS")
+
+    @validator("sizes")
+    def sizes_are_png_sizes(cls, sizes: list[str]) -> list[str]:
+        if unknown := [size for size in sizes if size not in PNG_SIZES]:
+            raise ValueError(
+                f"Unknown PNG sizes {unknown}, valid are {list(PNG_SIZES)}"
+            )
+        return sizes
+
+
 class ExternalAPIs(BaseSettings):
     infrared: str = Field(..., env="INFRARED_WRAPPER_API_ADDRESS", min_length=1)
     noise: str = Field(..., env="NOISE_API_ADDRESS", min_length=1)
@@ -58,6 +123,15 @@ class Settings(BaseSettings):
     cache: CacheRedis = Field(default_factory=CacheRedis)
     auth: Auth = Field(default_factory=Auth)
     external_apis: ExternalAPIs = Field(default_factory=ExternalAPIs)
+    uploads: UploadLimits = Field(default_factory=UploadLimits)
+    batch: BatchExecution = Field(default_factory=BatchExecution)
+    deduplication: ExecutionDeduplication = Field(
+        default_factory=ExecutionDeduplication
+    )
+    profiling: Profiling = Field(default_factory=Profiling)
+    openapi: OpenAPIDocs = Field(default_factory=OpenAPIDocs)
+    result_cache: ResultCaching = Field(default_factory=ResultCaching)
+    prerender: ResultPrerendering = Field(default_factory=ResultPrerendering)
     request_logging_endpoint: str = Field(..., env="REQUEST_LOGGING_ENDPOINT")
 
 
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+from typing import Optional
+
+from pydantic import BaseModel
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+
+
+class StoredExecution(BaseModel):
+    body_hash: str
+    # None while the execution is still being submitted upstream.
+    status_code: Optional[int]
+    content: str = ""
+    location: Optional[str]
+
+    @property
+    def pending(self) -> bool:
+        return self.status_code is None
+
+
+def canonical_body(body: bytes) -> bytes:
+    """Serialises a JSON body so that key order and whitespace don't matter."""
+    return json.dumps(
+        json.loads(body), sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode()
+
+
+def body_hash(body: bytes) -> str:
+    return hashlib.sha256(canonical_body(body)).hexdigest()
+
+
+def execution_key(
+    target_url: str,
+    body: bytes,
+    idempotency_key: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> str:
+    """
+    Returns the deduplication key of an execution request.
+
+    A client supplied `Idempotency-Key` takes precedence over the body hash and
+    is scoped to the user who sent it. Both are scoped to the target process.
+    """
+    digest = hashlib.sha256(target_url.encode() + b"\n")
+    if idempotency_key:
+        digest.update(b"idempotency-key\n" + f"{user_id or ''}\n".encode())
+        digest.update(idempotency_key.encode())
+    else:
+        digest.update(b"body\n" + canonical_body(body))
+    return digest.hexdigest()
+
+
+class ExecutionDeduplicator:
+    """
+    Maps execution requests to the response of their first submission.
+
+    A key is reserved with a short `pending_ttl_seconds` before the execution is
+    sent upstream, so that concurrent duplicates see it, and replaced by the
+    upstream response, kept for `ttl_seconds`, once that succeeded.
+
+    Storage errors are logged and treated as a miss, so that a Redis outage
+    never blocks job submission.
+    """
+
+    def __init__(
+        self,
+        storage_url: str,
+        ttl_seconds: int,
+        pending_ttl_seconds: int,
+        key_prefix: str = "execution",
+    ):
+        self.redis = aioredis.from_url(storage_url)
+        self.ttl_seconds = ttl_seconds
+        self.pending_ttl_seconds = pending_ttl_seconds
+        self.key_prefix = key_prefix
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.key_prefix}:{key}"
+
+    async def reserve(self, key: str, body_hash: str) -> Optional[StoredExecution]:
+        """
+        Reserves `key` for a new execution of a body hashing to `body_hash`.
+
+        Returns None if the caller holds the reservation and must submit the
+        execution, then `store` or `release` it. Otherwise returns the earlier
+        execution, which may still be pending.
+        """
+        redis_key = self._redis_key(key)
+        pending = StoredExecution(body_hash=body_hash, status_code=None, location=None)
+        try:
+            if await self.redis.set(
+                redis_key, pending.json(), nx=True, ex=self.pending_ttl_seconds
+            ):
+                return None
+            stored = await self.redis.get(redis_key)
+        except RedisError as exc:
+            logger.warning(f"Could not reserve execution deduplication key: {exc}")
+            return None
+        return StoredExecution.parse_raw(stored) if stored else None
+
+    async def store(
+        self,
+        key: str,
+        body_hash: str,
+        status_code: int,
+        content: bytes,
+        location: Optional[str],
+    ) -> None:
+        try:
+            execution = StoredExecution(
+                body_hash=body_hash,
+                status_code=status_code,
+                content=content.decode(),
+                location=location,
+            )
+        except UnicodeDecodeError:
+            logger.warning(
+                "Execution response is not text, it will not be deduplicated."
+            )
+            await self.release(key)
+            return
+        try:
+            await self.redis.set(
+                self._redis_key(key), execution.json(), ex=self.ttl_seconds
+            )
+        except RedisError as exc:
+            logger.warning(f"Could not store execution deduplication key: {exc}")
+
+    async def release(self, key: str) -> None:
+        """Drops a reservation whose execution could not be submitted."""
+        try:
+            await self.redis.delete(self._redis_key(key))
+        except RedisError as exc:
+            logger.warning(f"Could not release execution deduplication key: {exc}")
@@ -1,18 +1,66 @@
 from fastapi import Request
 
-from cut_api.auth.tokens import ApiUser, AuthErrorMissingToken, TokenManager
+from cut_api.auth.tokens import (
+    ApiUser,
+    AuthErrorMissingToken,
+    AuthErrorNotAnAdmin,
+    TokenManager,
+)
+from cut_api.caching import ResultCache
 from cut_api.config import settings
+from cut_api.deduplication import ExecutionDeduplicator
 from cut_api.rate_limiter.limiter import RateLimitMiddleware
+from cut_api.timing import SlowRequestProfiler
 
 LIMITER = RateLimitMiddleware(
     storage_url=settings.cache.broker_url,
     default_rate_per_minute=settings.limiter.default_limit,
 )
 
+DEDUPLICATOR = (
+    ExecutionDeduplicator(
+        storage_url=settings.cache.broker_url,
+        ttl_seconds=settings.deduplication.ttl_seconds,
+        pending_ttl_seconds=settings.deduplication.pending_ttl_seconds,
+    )
+    if settings.deduplication.enabled
+    else None
+)
 
-def authorise_request(request: Request) -> ApiUser:
+PROFILER = (
+    SlowRequestProfiler(
+        threshold_ms=settings.profiling.slow_request_threshold_ms,
+        max_profiles=settings.profiling.max_profiles,
+        sample_rate=settings.profiling.profiler_sample_rate,
+    )
+    if settings.profiling.profiler_enabled
+    else None
+)
+
+RESULT_CACHE = (
+    ResultCache(
+        storage_url=settings.cache.result_backend,
+        ttl_seconds=settings.cache.ttl_days * 24 * 60 * 60,
+        memory_max_bytes=settings.result_cache.memory_max_bytes,
+    )
+    if settings.result_cache.enabled
+    else None
+)
+
+
+def bearer_token(request: Request) -> str:
     if auth_header := request.headers.get("authorization"):
-        token = auth_header.replace("Bearer ", "")
-        _ = TokenManager(settings.auth.token_signing_key).verify_access_token(token)
-        return token
+        return auth_header.replace("Bearer ", "")
     raise AuthErrorMissingToken
+
+
+def authorise_request(request: Request) -> ApiUser:
+    token = bearer_token(request)
+    return TokenManager(settings.auth.token_signing_key).verify_access_token(token)
+
+
+def authorise_admin_request(request: Request) -> ApiUser:
+    user = authorise_request(request)
+    if user.email not in settings.profiling.admin_emails:
+        raise AuthErrorNotAnAdmin
+    return user
@@ -0,0 +1,310 @@
+import codecs
+import json
+import math
+from typing import Any, Optional
+
+GEOMETRY_TYPES = [
+    "Point",
+    "MultiPoint",
+    "LineString",
+    "MultiLineString",
+    "Polygon",
+    "MultiPolygon",
+    "GeometryCollection",
+]
+
+_WHITESPACE = " \t\n\r"
+
+
+class GeoJSONValidationError(Exception):
+    def __init__(self, message: str):
+        super().__init__(message)
+        self.message = message
+
+
+class GeoJSONTooLargeError(GeoJSONValidationError):
+    pass
+
+
+class _NeedMoreData(Exception):
+    pass
+
+
+def _is_coordinate(value: Any) -> bool:
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return False
+    try:
+        return math.isfinite(value)
+    except OverflowError:
+        # Integers too large for a float can't be coordinates either.
+        return False
+
+
+def _is_position(value: Any) -> bool:
+    return (
+        isinstance(value, list)
+        and len(value) >= 2
+        and all(_is_coordinate(coord) for coord in value)
+    )
+
+
+def _validate_positions(positions: Any, min_length: int, where: str) -> None:
+    if not isinstance(positions, list) or len(positions) < min_length:
+        raise GeoJSONValidationError(
+            f"{where} must contain at least {min_length} positions."
+        )
+    if not all(_is_position(position) for position in positions):
+        raise GeoJSONValidationError(f"{where} contains an invalid position.")
+
+
+def _validate_polygon(rings: Any, where: str) -> None:
+    if not isinstance(rings, list) or not rings:
+        raise GeoJSONValidationError(f"{where} must contain at least one ring.")
+    for ring in rings:
+        _validate_positions(ring, 4, where)
+        if ring[0] != ring[-1]:
+            raise GeoJSONValidationError(f"{where} contains a ring that is not closed.")
+
+
+def validate_geometry(geometry: Any, where: str = "Geometry") -> None:
+    """Check a GeoJSON geometry object against RFC 7946 structure rules."""
+    if not isinstance(geometry, dict):
+        raise GeoJSONValidationError(f"{where} must be an object.")
+
+    geometry_type = geometry.get("type")
+    if geometry_type not in GEOMETRY_TYPES:
+        raise GeoJSONValidationError(f"{where} has unknown type {geometry_type!r}.")
+
+    if geometry_type == "GeometryCollection":
+        geometries = geometry.get("geometries")
+        if not isinstance(geometries, list):
+            raise GeoJSONValidationError(f"{where} must contain a geometries array.")
+        for member in geometries:
+            validate_geometry(member, where)
+        return
+
+    where = f"{where} ({geometry_type})"
+    coordinates = geometry.get("coordinates")
+    if geometry_type == "Point":
+        if not _is_position(coordinates):
+            raise GeoJSONValidationError(f"{where} contains an invalid position.")
+    elif geometry_type == "MultiPoint":
+        _validate_positions(coordinates, 0, where)
+    elif geometry_type == "LineString":
+        _validate_positions(coordinates, 2, where)
+    elif geometry_type == "MultiLineString":
+        if not isinstance(coordinates, list):
+            raise GeoJSONValidationError(f"{where} must contain a coordinates array.")
+        for line in coordinates:
+            _validate_positions(line, 2, where)
+    elif geometry_type == "Polygon":
+        _validate_polygon(coordinates, where)
+    elif geometry_type == "MultiPolygon":
+        if not isinstance(coordinates, list):
+            raise GeoJSONValidationError(f"{where} must contain a coordinates array.")
+        for polygon in coordinates:
+            _validate_polygon(polygon, where)
+
+
+def validate_feature(feature: Any, index: int) -> None:
+    where = f"Feature {index}"
+    if not isinstance(feature, dict) or feature.get("type") != "Feature":
+        raise GeoJSONValidationError(f"{where} is not a GeoJSON Feature.")
+    if "geometry" not in feature:
+        raise GeoJSONValidationError(f"{where} has no geometry member.")
+    if not isinstance(feature.get("properties", {}), (dict, type(None))):
+        raise GeoJSONValidationError(f"{where} properties must be an object or null.")
+    if feature["geometry"] is not None:
+        validate_geometry(feature["geometry"], f"{where} geometry")
+
+
+class StreamingGeoJSONValidator:
+    """
+    Incrementally validates a GeoJSON FeatureCollection fed in chunks.
+
+    Features are decoded and checked one at a time, so the buffered text is
+    bounded by the largest single feature, which is capped by
+    `max_feature_size`, rather than the whole document. Limits are enforced as
+    soon as they are exceeded.
+
+    :param max_bytes: maximum accepted document size in bytes
+    :param max_features: maximum accepted number of features
+    :param max_feature_size: maximum size of a single feature (or other
+        top-level member) in characters of decoded JSON. A malformed value can
+        only be told apart from a truncated one once it is complete, so this
+        also bounds how much is buffered before bad input is rejected.
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        max_features: Optional[int] = None,
+        max_feature_size: Optional[int] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.max_features = max_features
+        self.max_feature_size = max_feature_size
+        self.bytes_read = 0
+        self.feature_count = 0
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        # Don't retry decoding an incomplete value until the buffer has doubled,
+        # so a single huge feature is not re-parsed for every chunk.
+        self._retry_at = 0
+        self._state = "start"
+        self._members: dict[str, Any] = {}
+
+    def feed(self, chunk: bytes) -> None:
+        self.bytes_read += len(chunk)
+        if self.max_bytes is not None and self.bytes_read > self.max_bytes:
+            raise GeoJSONTooLargeError(
+                f"GeoJSON exceeds the maximum size of {self.max_bytes} bytes."
+            )
+        try:
+            self._buffer += self._decoder.decode(chunk)
+        except UnicodeDecodeError as error:
+            raise GeoJSONValidationError("GeoJSON must be UTF-8 encoded.") from error
+        if len(self._buffer) >= self._retry_at:
+            self._parse()
+        if (
+            self.max_feature_size is not None
+            and len(self._buffer) > self.max_feature_size
+        ):
+            # The buffer may already hold the rest of a deferred value, decode
+            # it before concluding that the pending value is too large.
+            self._parse()
+            if len(self._buffer) > self.max_feature_size:
+                raise GeoJSONTooLargeError(
+                    "A GeoJSON feature exceeds the maximum size of "
+                    f"{self.max_feature_size} characters, or the document is malformed."
+                )
+
+    def close(self) -> None:
+        """Signal the end of the document and run the final checks."""
+        try:
+            self._buffer += self._decoder.decode(b"", final=True)
+        except UnicodeDecodeError as error:
+            raise GeoJSONValidationError("GeoJSON must be UTF-8 encoded.") from error
+        self._eof = True
+        self._parse()
+
+        if self._state != "end":
+            raise GeoJSONValidationError("GeoJSON document is incomplete.")
+        if self._members.get("type") != "FeatureCollection":
+            raise GeoJSONValidationError("GeoJSON must be a FeatureCollection.")
+        if "features" not in self._members:
+            raise GeoJSONValidationError("FeatureCollection has no features member.")
+
+    def _parse(self) -> None:
+        step_start = self._pos
+        try:
+            while self._step():
+                step_start = self._pos
+        except _NeedMoreData:
+            if self._eof:
+                raise GeoJSONValidationError("GeoJSON document is incomplete.")
+            # Steps are atomic: rewind and redo the interrupted one next time.
+            self._pos = step_start
+            self._retry_at = 2 * (len(self._buffer) - self._pos) + self._pos
+        # Drop everything already consumed.
+        consumed = self._pos
+        self._buffer = self._buffer[consumed:]
+        self._retry_at = max(0, self._retry_at - consumed)
+        self._pos = 0
+
+    def _next_char(self) -> str:
+        while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+            self._pos += 1
+        if self._pos == len(self._buffer):
+            if self._eof:
+                return ""
+            raise _NeedMoreData
+        return self._buffer[self._pos]
+
+    def _expect(self, expected: str) -> str:
+        char = self._next_char()
+        if not char or char not in expected:
+            raise GeoJSONValidationError(f"Malformed GeoJSON: unexpected {char!r}.")
+        self._pos += 1
+        return char
+
+    def _decode_value(self) -> Any:
+        self._next_char()
+        try:
+            value, end = self._json.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError as error:
+            # A truncated value and a malformed one are indistinguishable until
+            # the whole value has arrived, memory stays bounded by max_feature_size.
+            if self._eof:
+                raise GeoJSONValidationError(
+                    f"Malformed GeoJSON: {error.msg}."
+                ) from error
+            raise _NeedMoreData from error
+        except ValueError as error:
+            # e.g. integers beyond Python's int string conversion limit
+            raise GeoJSONValidationError(f"Malformed GeoJSON: {error}") from error
+        # A number ending exactly at the buffer end may continue in the next chunk.
+        if (
+            end == len(self._buffer)
+            and not self._eof
+            and self._buffer[end - 1] not in '}]"'
+        ):
+            raise _NeedMoreData
+        self._pos = end
+        return value
+
+    def _step(self) -> bool:
+        if self._state == "start":
+            self._expect("{")
+            self._state = "first_key"
+        elif self._state in ("first_key", "key"):
+            if self._state == "first_key" and self._next_char() == "}":
+                self._pos += 1
+                self._state = "end"
+                return True
+            key = self._decode_value()
+            if not isinstance(key, str):
+                raise GeoJSONValidationError(
+                    "Malformed GeoJSON: expected a member name."
+                )
+            self._expect(":")
+            if key == "features":
+                self._expect("[")
+                self._members["features"] = True
+                self._state = "first_feature"
+            else:
+                self._members[key] = self._decode_value()
+                self._state = "after_member"
+        elif self._state == "after_member":
+            if self._expect(",}") == "}":
+                self._state = "end"
+            else:
+                self._state = "key"
+        elif self._state in ("first_feature", "feature"):
+            if self._state == "first_feature" and self._next_char() == "]":
+                self._pos += 1
+                self._state = "after_member"
+                return True
+            feature = self._decode_value()
+            validate_feature(feature, self.feature_count)
+            self.feature_count += 1
+            if self.max_features is not None and self.feature_count > self.max_features:
+                raise GeoJSONTooLargeError(
+                    f"GeoJSON exceeds the maximum of {self.max_features} features."
+                )
+            self._state = "after_feature"
+        elif self._state == "after_feature":
+            if self._expect(",]") == "]":
+                self._state = "after_member"
+            else:
+                self._state = "feature"
+        elif self._state == "end":
+            if self._next_char():
+                raise GeoJSONValidationError(
+                    "Malformed GeoJSON: unexpected data after the document."
+                )
+            return False
+        return True
@@ -23,12 +23,12 @@ class RateLimitMiddleware:
         self.default_rate_per_minute = default_rate_per_minute
 
     async def can_pass_request(
-        self, request: Request, rate_per_minute: int = None
+        self, request: Request, rate_per_minute: int = None, cost: int = 1
     ) -> bool:
         if not rate_per_minute:
             rate_per_minute = self.default_rate_per_minute
         key = await self.identifier(request)
-        return self._hit(key=key, rate_per_minute=rate_per_minute)
+        return self._hit(key=key, rate_per_minute=rate_per_minute, cost=cost)
 
     def _rate_limit_item_for(self, rate_per_minute: int) -> RateLimitItem:
         """
@@ -0,0 +1,100 @@
+import cProfile
+import marshal
+import random
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+from pydantic import BaseModel
+
+# Stage durations (ms) of the request being handled, None outside a request.
+_request_timings: ContextVar[Optional[dict[str, float]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def start_request_timings() -> dict[str, float]:
+    timings: dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Adds the wall time spent in the block to `stage` of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if (timings := _request_timings.get()) is not None:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            timings[stage] = timings.get(stage, 0.0) + elapsed_ms
+
+
+def server_timing_header(timings: dict[str, float]) -> str:
+    return ", ".join(
+        f"{stage};dur={duration:.1f}" for stage, duration in timings.items()
+    )
+
+
+class CapturedProfile(BaseModel):
+    id: str
+    method: str
+    path: str
+    duration_ms: float
+    created_at: datetime
+    # Same format as `pstats.Stats.dump_stats`, loadable with pstats/snakeviz.
+    stats: bytes
+
+
+class SlowRequestProfiler:
+    """
+    Profiles a sample of requests with cProfile and keeps the last
+    `max_profiles` of those slower than `threshold_ms`.
+
+    cProfile can only run once per thread, so at most one request is profiled at
+    a time, and its profile also contains whatever other coroutines ran on the
+    event loop meanwhile.
+    """
+
+    def __init__(
+        self, threshold_ms: float, max_profiles: int, sample_rate: float = 1.0
+    ):
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.profiles: deque[CapturedProfile] = deque(maxlen=max_profiles)
+        self._active = False
+
+    def start(self) -> Optional[cProfile.Profile]:
+        if self._active or random.random() >= self.sample_rate:
+            return None
+        self._active = True
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(
+        self, profile: cProfile.Profile, method: str, path: str, duration_ms: float
+    ) -> None:
+        profile.disable()
+        self._active = False
+        if duration_ms < self.threshold_ms:
+            return
+        profile.create_stats()
+        self.profiles.append(
+            CapturedProfile(
+                id=uuid.uuid4().hex,
+                method=method,
+                path=path,
+                duration_ms=duration_ms,
+                created_at=datetime.now(timezone.utc),
+                stats=marshal.dumps(profile.stats),
+            )
+        )
+
+    def get(self, profile_id: str) -> Optional[CapturedProfile]:
+        return next((p for p in self.profiles if p.id == profile_id), None)
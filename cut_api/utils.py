@@ -1,28 +1,52 @@
 import base64
+import importlib
 import logging
 import random
 import string
 from enum import Enum
 from io import BytesIO
+from types import ModuleType
+from typing import Optional
 
-import bcrypt
-import geopandas as gpd
-import matplotlib.pyplot as plt
 from fastapi import HTTPException, UploadFile
 
+from cut_api.config import DEFAULT_PNG_SIZE, PNG_SIZES, settings
+from cut_api.geojson import (
+    GeoJSONTooLargeError,
+    GeoJSONValidationError,
+    StreamingGeoJSONValidator,
+)
+
 logger = logging.getLogger(__name__)
 
+# geopandas, matplotlib and bcrypt add seconds to startup and tens of MB of RSS
+# to every worker, while most requests are plain proxying. They are imported on
+# first use instead of at module import.
+_LAZY_MODULES: dict[str, ModuleType] = {}
+
+
+def _lazy_import(name: str) -> ModuleType:
+    if name not in _LAZY_MODULES:
+        if name == "matplotlib.pyplot":
+            # Workers have no display, select the non-interactive backend
+            # before pyplot is loaded.
+            importlib.import_module("matplotlib").use("Agg")
+        _LAZY_MODULES[name] = importlib.import_module(name)
+    return _LAZY_MODULES[name]
+
 
 def enum_to_list(enum_class: Enum) -> list[str]:
     return [member.value for member in enum_class]
 
 
 def hash_password(password: str) -> str:
+    bcrypt = _lazy_import("bcrypt")
     salt = bcrypt.gensalt()
     return bcrypt.hashpw(password.encode(), salt).decode()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
+    bcrypt = _lazy_import("bcrypt")
     return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
 
 
@@ -31,27 +55,64 @@ def generate_safe_password(length=15):
     return "".join(random.choice(characters) for _ in range(length))
 
 
-async def validate_geojson(file: UploadFile) -> gpd.GeoDataFrame:
+async def validate_geojson(
+    file: UploadFile,
+    max_bytes: Optional[int] = None,
+    max_features: Optional[int] = None,
+    max_feature_size: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> bytearray:
+    """
+    Validates an uploaded GeoJSON FeatureCollection while streaming it in chunks.
+
+    Returns the validated bytes unchanged, ready to be forwarded upstream, in
+    the buffer they were read into to avoid holding the upload twice.
+    Limits default to `settings.uploads`.
+    """
     if file.filename.split(".")[-1] != "json":
         logger.error("File extension must be JSON.")
         raise HTTPException(status_code=422, detail="File extension must be JSON.")
-    contents = await file.read()
+
+    if max_bytes is None:
+        max_bytes = settings.uploads.geojson_max_bytes
+    if max_features is None:
+        max_features = settings.uploads.geojson_max_features
+    if max_feature_size is None:
+        max_feature_size = settings.uploads.geojson_max_feature_size
+    if chunk_size is None:
+        chunk_size = settings.uploads.chunk_size
+
+    validator = StreamingGeoJSONValidator(
+        max_bytes=max_bytes,
+        max_features=max_features,
+        max_feature_size=max_feature_size,
+    )
+    contents = bytearray()
     try:
-        gdf = gpd.read_file(BytesIO(contents))
-        return gdf.to_json()
-    except Exception as e:
-        logger.error("File is not a valid GeoJSON.", exc_info=True)
+        while chunk := await file.read(chunk_size):
+            validator.feed(chunk)
+            contents.extend(chunk)
+        validator.close()
+    except GeoJSONTooLargeError as e:
+        logger.error(e.message)
+        raise HTTPException(status_code=413, detail=e.message) from e
+    except GeoJSONValidationError as e:
+        logger.error(f"File is not a valid GeoJSON: {e.message}")
         raise HTTPException(
-            status_code=422, detail="File is not a valid GeoJSON."
+            status_code=422, detail=f"File is not a valid GeoJSON. {e.message}"
         ) from e
+    return contents
+
 
+def geojson_to_rasterized_png(geojson, dpi: int = PNG_SIZES[DEFAULT_PNG_SIZE]):
+    gpd = _lazy_import("geopandas")
+    plt = _lazy_import("matplotlib.pyplot")
 
-def geojson_to_rasterized_png(geojson):
     # Convert GeoJSON to GeoDataFrame
     gdf = gpd.GeoDataFrame.from_features(geojson["features"])
 
     # Create a figure for the plot
-    fig, ax = plt.subplots(figsize=(10, 10))
+    fig, ax = plt.subplots(figsize=(10, 10), dpi=dpi)
 
     # Plot GeoDataFrame
     gdf.plot(ax=ax)
@@ -0,0 +1,138 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from tests.env import load_env_example
+
+# Tests importing the app need its settings, the example values don't override
+# a configured environment.
+for key, value in load_env_example().items():
+    os.environ.setdefault(key, value)
+
+ROUTING_TABLE = {
+    "noise": "http://noise-api",
+    "stormwater": "http://stormwater-api",
+}
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def hset(self, key, mapping):
+        self.commands.append((key, mapping))
+
+    def expire(self, key, seconds):
+        pass
+
+    async def execute(self):
+        await asyncio.sleep(0)
+        for key, mapping in self.commands:
+            self.redis.data[key] = {
+                field.encode(): value if isinstance(value, bytes) else value.encode()
+                for field, value in mapping.items()
+            }
+
+
+class FakeRedis:
+    """In-memory stand-in for redis.asyncio, every command yields like a round-trip."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        await asyncio.sleep(0)
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        await asyncio.sleep(0)
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+    async def delete(self, key):
+        await asyncio.sleep(0)
+        self.data.pop(key, None)
+
+    async def hgetall(self, key):
+        await asyncio.sleep(0)
+        return self.data.get(key, {})
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakeLimiter:
+    default_rate_per_minute = 50
+
+    def __init__(self):
+        self.costs = []
+
+    async def can_pass_request(self, request, cost=1):
+        self.costs.append(cost)
+        return True
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
+
+
+@pytest.fixture
+def app_client(monkeypatch):
+    """
+    Returns a factory of test clients for the app whose upstream requests are
+    answered by `handler`.
+
+    The limiter, authorisation and request event logging are stubbed, the
+    bearer token is taken as the user id. The clients record the limiter
+    costs, authorised users and logged events. Deduplication, the result cache
+    and pre-rendering are disabled unless a fixture patches them back in.
+    """
+    from fastapi.testclient import TestClient
+
+    from cut_api.api import main
+
+    monkeypatch.setattr(main, "DEDUPLICATOR", None)
+    monkeypatch.setattr(main, "RESULT_CACHE", None)
+    monkeypatch.setattr(main, "PRERENDERER", None)
+
+    def make_client(handler=None):
+        client = TestClient(main.app)
+        client.limiter = FakeLimiter()
+        client.authorised = []
+        client.events = []
+
+        def authorise_request(request):
+            user = SimpleNamespace(id=main.bearer_token(request))
+            client.authorised.append(user)
+            return user
+
+        async def register_request_event(token, endpoint):
+            client.events.append(endpoint)
+
+        monkeypatch.setattr(main, "LIMITER", client.limiter)
+        monkeypatch.setattr(main, "ROUTING_TABLE", ROUTING_TABLE)
+        monkeypatch.setattr(main, "authorise_request", authorise_request)
+        monkeypatch.setattr(main, "register_request_event", register_request_event)
+        monkeypatch.setattr(
+            main,
+            "upstream_client",
+            lambda **kwargs: httpx.AsyncClient(
+                transport=httpx.MockTransport(handler), **kwargs
+            ),
+        )
+        return client
+
+    return make_client
@@ -0,0 +1,16 @@
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+ENV_EXAMPLE = REPO_ROOT / ".env.example"
+
+
+def load_env_example(file_path=ENV_EXAMPLE):
+    env = {}
+    with open(file_path, "r") as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            key, value = line.split("=", 1)
+            env[key] = value.strip("\"'")
+    return env
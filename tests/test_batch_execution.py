@@ -0,0 +1,155 @@
+import asyncio
+
+import httpx
+
+from cut_api.api.batch import BatchExecutionItem, execute_batch
+from cut_api.deduplication import ExecutionDeduplicator
+
+ROUTING_TABLE = {
+    "noise": "http://noise-api",
+    "stormwater": "http://stormwater-api",
+}
+
+
+def run_batch(handler, items, max_concurrency=2, deduplicator=None):
+    async def _run():
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await execute_batch(
+                client, items, ROUTING_TABLE, max_concurrency, deduplicator
+            )
+
+    return asyncio.run(_run())
+
+
+def test_batch_reports_job_ids_and_errors_per_item():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "stormwater-api":
+            return httpx.Response(500, text="simulation failed")
+        return httpx.Response(
+            201,
+            headers={"Location": "http://noise-api/noise/jobs/abc-123"},
+            json={"status": "accepted"},
+        )
+
+    results = run_batch(
+        handler,
+        [
+            BatchExecutionItem(service="noise", process_id="traffic-noise"),
+            BatchExecutionItem(service="stormwater", process_id="stormwater"),
+            BatchExecutionItem(service="wind", process_id="wind"),
+        ],
+    )
+
+    assert [result.index for result in results] == [0, 1, 2]
+    assert results[0].status_code == 201
+    assert results[0].job_id == "abc-123"
+    assert results[0].location == "http://noise-api/noise/jobs/abc-123"
+    assert results[1].status_code == 500
+    assert results[1].error == "simulation failed"
+    assert results[2].status_code == 404
+    assert results[2].job_id is None
+
+
+def test_batch_respects_concurrency_bound():
+    in_flight = 0
+    max_in_flight = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(201, json={"jobID": "job"})
+
+    items = [
+        BatchExecutionItem(service="noise", process_id="traffic-noise")
+        for _ in range(10)
+    ]
+    results = run_batch(handler, items, max_concurrency=3)
+
+    assert max_in_flight == 3
+    assert all(result.job_id == "job" for result in results)
+
+
+def test_identical_items_are_submitted_once(fake_redis):
+    upstream_requests = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        upstream_requests.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(
+            201,
+            headers={"Location": "http://noise-api/noise/jobs/j1"},
+            json={"jobID": "j1"},
+        )
+
+    deduplicator = ExecutionDeduplicator(
+        "redis://localhost:6379/0", ttl_seconds=3600, pending_ttl_seconds=60
+    )
+    deduplicator.redis = fake_redis
+    items = [
+        BatchExecutionItem(
+            service="noise", process_id="traffic-noise", payload={"a": 1, "b": 2}
+        ),
+        BatchExecutionItem(service="noise", process_id="wind", payload={"a": 1}),
+        BatchExecutionItem(
+            service="noise", process_id="traffic-noise", payload={"b": 2, "a": 1}
+        ),
+    ]
+
+    results = run_batch(handler, items, deduplicator=deduplicator)
+
+    assert len(upstream_requests) == 2
+    assert [result.index for result in results] == [0, 1, 2]
+    assert [result.status_code for result in results] == [201, 201, 201]
+    assert results[0].job_id == results[2].job_id == "j1"
+    assert results[2].location == "http://noise-api/noise/jobs/j1"
+
+
+def test_batch_endpoint_authorises_limits_and_logs_once(app_client):
+    upstream_requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        upstream_requests.append(request)
+        return httpx.Response(201, json={"jobID": "job"})
+
+    client = app_client(handler)
+    items = [{"service": "noise", "process_id": "traffic-noise"} for _ in range(3)]
+
+    response = client.post(
+        "/batch/execution",
+        json={"items": items},
+        headers={"Authorization": "Bearer user-1"},
+    )
+
+    assert response.status_code == 200
+    assert [r["job_id"] for r in response.json()["results"]] == ["job"] * 3
+    assert len(upstream_requests) == 3
+    assert len(client.authorised) == 1
+    assert client.limiter.costs == [3]
+    assert client.events == ["http://testserver/batch/execution"]
+
+
+def test_batch_endpoint_rejects_batch_above_rate_limit(app_client):
+    client = app_client()
+    client.limiter.default_rate_per_minute = 2
+    items = [{"service": "noise", "process_id": "traffic-noise"}] * 3
+
+    response = client.post("/batch/execution", json={"items": items})
+
+    assert response.status_code == 422
+    assert "per minute" in response.json()["message"]
+    assert client.limiter.costs == []
+    assert client.authorised == []
+
+
+def test_batch_endpoint_rejects_process_id_outside_path_segment(app_client):
+    client = app_client()
+    items = [{"service": "noise", "process_id": "../admin?x=1"}]
+
+    response = client.post("/batch/execution", json={"items": items})
+
+    assert response.status_code == 422
+    assert client.limiter.costs == []
@@ -0,0 +1,160 @@
+import asyncio
+
+import httpx
+import pytest
+
+from cut_api.deduplication import (
+    IDEMPOTENCY_KEY_HEADER,
+    ExecutionDeduplicator,
+    body_hash,
+    execution_key,
+)
+
+TARGET_URL = "http://noise-api/noise/processes/traffic-noise/execution"
+
+
+def test_key_ignores_key_order_and_whitespace():
+    body = b'{"inputs": {"max_speed": 50, "buildings": []}, "mode": "async"}'
+    reordered = b'{ "mode": "async",\n "inputs": {"buildings": [], "max_speed": 50}}'
+    assert execution_key(TARGET_URL, body) == execution_key(TARGET_URL, reordered)
+
+
+def test_key_depends_on_body_and_target():
+    body = b'{"inputs": {"max_speed": 50}}'
+    assert execution_key(TARGET_URL, body) != execution_key(
+        TARGET_URL, b'{"inputs": {"max_speed": 30}}'
+    )
+    assert execution_key(TARGET_URL, body) != execution_key(
+        TARGET_URL.replace("noise", "stormwater"), body
+    )
+
+
+def test_idempotency_key_takes_precedence_over_body():
+    assert execution_key(TARGET_URL, b'{"a": 1}', "key-1") == execution_key(
+        TARGET_URL, b'{"a": 2}', "key-1"
+    )
+    assert execution_key(TARGET_URL, b'{"a": 1}', "key-1") != execution_key(
+        TARGET_URL, b'{"a": 1}', "key-2"
+    )
+
+
+def test_idempotency_key_depends_on_user():
+    assert execution_key(TARGET_URL, b"{}", "key-1", "user-1") != execution_key(
+        TARGET_URL, b"{}", "key-1", "user-2"
+    )
+
+
+@pytest.fixture
+def deduplicator(app_client, fake_redis, monkeypatch):
+    from cut_api.api import main
+
+    deduplicator = ExecutionDeduplicator(
+        "redis://localhost:6379/0", ttl_seconds=3600, pending_ttl_seconds=60
+    )
+    deduplicator.redis = fake_redis
+    monkeypatch.setattr(main, "DEDUPLICATOR", deduplicator)
+    return deduplicator
+
+
+def execute(client, payload, user="user-1", idempotency_key=None):
+    headers = {"Authorization": f"Bearer {user}"}
+    if idempotency_key:
+        headers[IDEMPOTENCY_KEY_HEADER] = idempotency_key
+    return client.post(
+        "/noise/processes/traffic-noise/execution", json=payload, headers=headers
+    )
+
+
+def accepting_upstream(upstream_requests, redis=None):
+    def handler(request: httpx.Request) -> httpx.Response:
+        if redis:
+            # The key is reserved before the upstream sees the execution.
+            assert len(redis.data) == 1
+        upstream_requests.append(request)
+        job_id = f"job-{len(upstream_requests)}"
+        return httpx.Response(
+            201,
+            headers={"Location": f"http://noise-api/noise/jobs/{job_id}"},
+            json={"jobID": job_id},
+        )
+
+    return handler
+
+
+def test_repeat_is_replayed_without_reaching_upstream(app_client, deduplicator):
+    upstream_requests = []
+    client = app_client(accepting_upstream(upstream_requests, deduplicator.redis))
+
+    first = execute(client, {"inputs": {"max_speed": 50}}, idempotency_key="key-1")
+    repeat = execute(client, {"inputs": {"max_speed": 50}}, idempotency_key="key-1")
+
+    assert len(upstream_requests) == 1
+    assert repeat.status_code == first.status_code == 201
+    assert repeat.headers["Location"] == "http://noise-api/noise/jobs/job-1"
+    assert repeat.json() == {"jobID": "job-1"}
+
+
+def test_idempotency_key_reused_with_different_body_is_rejected(
+    app_client, deduplicator
+):
+    upstream_requests = []
+    client = app_client(accepting_upstream(upstream_requests))
+
+    execute(client, {"inputs": {"max_speed": 50}}, idempotency_key="key-1")
+    response = execute(client, {"inputs": {"max_speed": 30}}, idempotency_key="key-1")
+
+    assert response.status_code == 422
+    assert len(upstream_requests) == 1
+
+
+def test_idempotency_key_is_scoped_to_the_user(app_client, deduplicator):
+    upstream_requests = []
+    client = app_client(accepting_upstream(upstream_requests))
+
+    execute(client, {"inputs": {}}, user="user-1", idempotency_key="key-1")
+    response = execute(client, {"inputs": {}}, user="user-2", idempotency_key="key-1")
+
+    assert response.headers["Location"] == "http://noise-api/noise/jobs/job-2"
+    assert len(upstream_requests) == 2
+
+
+def test_concurrent_duplicate_does_not_reach_upstream(app_client, deduplicator):
+    upstream_requests = []
+    client = app_client(accepting_upstream(upstream_requests))
+    body = b'{"inputs": {}}'
+    key = execution_key(
+        "http://noise-api/noise/processes/traffic-noise/execution", body
+    )
+    assert asyncio.run(deduplicator.reserve(key, body_hash(body))) is None
+
+    response = execute(client, {"inputs": {}})
+
+    assert response.status_code == 409
+    assert upstream_requests == []
+
+
+def test_failed_submission_releases_the_key(app_client, deduplicator):
+    responses = [httpx.Response(503), httpx.Response(201, json={"jobID": "job"})]
+    client = app_client(lambda request: responses.pop(0))
+
+    assert execute(client, {"inputs": {}}).status_code == 503
+    assert execute(client, {"inputs": {}}).status_code == 201
+    assert responses == []
+
+
+def test_preflight_allows_idempotency_key(app_client):
+    client = app_client()
+
+    for path in ["/noise/processes/traffic-noise/execution", "/batch/execution"]:
+        response = client.options(
+            path,
+            headers={
+                "Origin": "https://dashboard.example",
+                "Access-Control-Request-Method": "POST",
+                "Access-Control-Request-Headers": "idempotency-key",
+            },
+        )
+
+        assert response.status_code == 200
+        allowed = response.headers["Access-Control-Allow-Headers"].lower()
+        assert "idempotency-key" in allowed
@@ -0,0 +1,196 @@
+import asyncio
+import io
+import json
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from cut_api.config import settings
+from cut_api.geojson import (
+    GeoJSONTooLargeError,
+    GeoJSONValidationError,
+    StreamingGeoJSONValidator,
+)
+from cut_api.utils import validate_geojson
+
+PNG_TEST_CASE = Path(__file__).parent / "test_cases" / "geojson_to_png_test_case.json"
+
+
+def load_test_feature_collection():
+    with open(PNG_TEST_CASE, "r") as file:
+        return json.load(file)["input"]
+
+
+def validate_in_chunks(contents: bytes, chunk_size: int, **limits):
+    validator = StreamingGeoJSONValidator(**limits)
+    for start in range(0, len(contents), chunk_size):
+        end = start + chunk_size
+        validator.feed(contents[start:end])
+    validator.close()
+    return validator
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1024 * 1024])
+def test_valid_feature_collection(chunk_size):
+    feature_collection = load_test_feature_collection()
+    contents = json.dumps(feature_collection, indent=2).encode()
+    validator = validate_in_chunks(contents, chunk_size)
+    assert validator.feature_count == len(feature_collection["features"])
+
+
+def test_empty_feature_collection():
+    contents = b'{"features": [], "type": "FeatureCollection", "bbox": [0, 0, 1, 1]}'
+    assert validate_in_chunks(contents, 3).feature_count == 0
+
+
+@pytest.mark.parametrize(
+    "contents",
+    [
+        b'{"type": "Feature", "geometry": null, "properties": {}}',
+        b'{"type": "FeatureCollection"}',
+        b'{"type": "FeatureCollection", "features": [{"type": "Feature"}]}',
+        b'{"type": "FeatureCollection", "features": [',
+        b'{"type": "FeatureCollection", "features": []} trailing',
+        b"[]",
+    ],
+)
+def test_invalid_structure(contents):
+    with pytest.raises(GeoJSONValidationError):
+        validate_in_chunks(contents, 5)
+
+
+@pytest.mark.parametrize(
+    "geometry",
+    [
+        {"type": "Point", "coordinates": [1]},
+        {"type": "LineString", "coordinates": [[0, 0]]},
+        {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [1, 1], [0, 1]]]},
+        {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [0, 0]]]},
+        {"type": "Circle", "coordinates": [0, 0]},
+    ],
+)
+def test_invalid_geometry(geometry):
+    feature_collection = {
+        "type": "FeatureCollection",
+        "features": [{"type": "Feature", "geometry": geometry, "properties": {}}],
+    }
+    with pytest.raises(GeoJSONValidationError):
+        validate_in_chunks(json.dumps(feature_collection).encode(), 16)
+
+
+def test_size_limit_enforced_before_document_ends():
+    contents = json.dumps(load_test_feature_collection()).encode()
+    validator = StreamingGeoJSONValidator(max_bytes=100)
+    with pytest.raises(GeoJSONTooLargeError):
+        validator.feed(contents[:101])
+
+
+def test_feature_limit():
+    contents = json.dumps(load_test_feature_collection()).encode()
+    with pytest.raises(GeoJSONTooLargeError):
+        validate_in_chunks(contents, 64, max_features=1)
+
+
+@pytest.mark.parametrize(
+    "coordinate",
+    [b"1" + b"0" * 400, b"1" + b"0" * 5000],
+    ids=["beyond-float", "beyond-int-digit-limit"],
+)
+def test_huge_integer_coordinate_is_invalid(coordinate):
+    contents = (
+        b'{"type": "FeatureCollection", "features": [{"type": "Feature", '
+        b'"properties": {}, "geometry": {"type": "Point", "coordinates": [0, '
+        + coordinate
+        + b"]}}]}"
+    )
+    with pytest.raises(GeoJSONValidationError):
+        validate_in_chunks(contents, 64)
+
+
+def test_malformed_value_rejected_before_document_ends():
+    validator = StreamingGeoJSONValidator(max_feature_size=1000)
+    validator.feed(b'{"type": "FeatureCollection", "features": [{"type": x')
+    with pytest.raises(GeoJSONTooLargeError):
+        for _ in range(100):
+            validator.feed(b" " * 64)
+
+
+def test_feature_size_limit_allows_features_below_it():
+    contents = json.dumps(load_test_feature_collection()).encode()
+    largest = max(
+        len(json.dumps(feature))
+        for feature in load_test_feature_collection()["features"]
+    )
+    validator = validate_in_chunks(contents, 100, max_feature_size=2 * largest)
+    assert validator.feature_count == 72
+
+
+def upload(contents: bytes, filename: str = "buildings.json") -> UploadFile:
+    return UploadFile(io.BytesIO(contents), filename=filename)
+
+
+def test_validate_geojson_returns_uploaded_bytes():
+    contents = json.dumps(load_test_feature_collection()).encode()
+    validated = asyncio.run(
+        validate_geojson(
+            upload(contents),
+            max_bytes=len(contents),
+            max_features=100,
+            max_feature_size=len(contents),
+            chunk_size=1024,
+        )
+    )
+    assert validated == contents
+
+
+@pytest.mark.parametrize(
+    "limits, status_code",
+    [
+        ({"max_bytes": 100}, 413),
+        ({"max_features": 1}, 413),
+        ({"max_feature_size": 10}, 413),
+    ],
+)
+def test_validate_geojson_limits_return_413(limits, status_code):
+    contents = json.dumps(load_test_feature_collection()).encode()
+    kwargs = {
+        "max_bytes": len(contents),
+        "max_features": 100,
+        "max_feature_size": len(contents),
+        "chunk_size": 1024,
+        **limits,
+    }
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(validate_geojson(upload(contents), **kwargs))
+    assert exc_info.value.status_code == status_code
+
+
+@pytest.mark.parametrize(
+    "contents, filename",
+    [
+        (b'{"type": "FeatureCollection", "features": [', "buildings.json"),
+        (b'{"type": "FeatureCollection", "features": []}', "buildings.geojson"),
+    ],
+)
+def test_validate_geojson_invalid_upload_returns_422(contents, filename):
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(
+            validate_geojson(
+                upload(contents, filename),
+                max_bytes=1000,
+                max_features=10,
+                max_feature_size=1000,
+                chunk_size=8,
+            )
+        )
+    assert exc_info.value.status_code == 422
+
+
+def test_validate_geojson_limits_default_to_settings(monkeypatch):
+    monkeypatch.setattr(settings.uploads, "geojson_max_bytes", 10)
+    monkeypatch.setattr(settings.uploads, "chunk_size", 4)
+    contents = b'{"type": "FeatureCollection", "features": []}'
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(validate_geojson(upload(contents)))
+    assert exc_info.value.status_code == 413
@@ -0,0 +1,197 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from cut_api.api.openapi import OpenAPIDocsCache, merge_openapi_specs
+
+GATEWAY_SPEC = {
+    "openapi": "3.1.0",
+    "info": {"title": "CUT Prototype Public API", "version": "0.1.0"},
+    "paths": {"/health_check": {"get": {"operationId": "health_check"}}},
+}
+
+
+def service_spec(path_prefix=""):
+    return {
+        "openapi": "3.1.0",
+        "paths": {
+            f"{path_prefix}/jobs/{{job_id}}": {
+                "parameters": [{"name": "job_id", "in": "path"}],
+                "get": {
+                    "operationId": "get_job",
+                    "tags": ["jobs"],
+                    "responses": {
+                        "200": {
+                            "content": {
+                                "application/json": {
+                                    "schema": {"$ref": "#/components/schemas/Job"}
+                                }
+                            }
+                        }
+                    },
+                },
+            }
+        },
+        "components": {"schemas": {"Job": {"type": "object"}}},
+    }
+
+
+def test_merge_prefixes_paths_and_namespaces_components():
+    merged = merge_openapi_specs(
+        GATEWAY_SPEC,
+        {"noise": service_spec(), "stormwater": service_spec("/stormwater")},
+    )
+
+    assert list(merged["paths"]) == [
+        "/health_check",
+        "/noise/jobs/{job_id}",
+        "/stormwater/jobs/{job_id}",
+    ]
+    operation = merged["paths"]["/noise/jobs/{job_id}"]["get"]
+    assert operation["operationId"] == "noise_get_job"
+    assert operation["tags"] == ["noise"]
+    schema = operation["responses"]["200"]["content"]["application/json"]["schema"]
+    assert schema == {"$ref": "#/components/schemas/noise.Job"}
+    assert set(merged["components"]["schemas"]) == {"noise.Job", "stormwater.Job"}
+
+
+def test_merge_does_not_modify_gateway_spec():
+    merge_openapi_specs(GATEWAY_SPEC, {"noise": service_spec()})
+    assert list(GATEWAY_SPEC["paths"]) == ["/health_check"]
+    assert "components" not in GATEWAY_SPEC
+
+
+class FakeUpstreams:
+    """Serves every service's docs, services in `down` answer 503."""
+
+    def __init__(self):
+        self.specs = {"noise": service_spec(), "stormwater": service_spec()}
+        self.down = set()
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(str(request.url))
+        service, document = request.url.path.strip("/").split("/", 1)
+        if service in self.down:
+            return httpx.Response(503)
+        if document == "openapi.json":
+            return httpx.Response(200, json=self.specs[service])
+        return httpx.Response(200, text=f"<html>{service} {document}</html>")
+
+    def client_factory(self, **kwargs):
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler), **kwargs)
+
+
+@pytest.fixture
+def upstreams():
+    return FakeUpstreams()
+
+
+def docs_cache(upstreams, ttl_seconds=60):
+    return OpenAPIDocsCache(
+        gateway_spec=lambda: GATEWAY_SPEC,
+        routing_table={
+            "noise": "http://noise-api",
+            "stormwater": "http://stormwater-api",
+        },
+        ttl_seconds=ttl_seconds,
+        timeout_seconds=1,
+        client_factory=upstreams.client_factory,
+    )
+
+
+def merged_paths(document):
+    return list(json.loads(document.content)["paths"])
+
+
+def test_expired_docs_are_served_stale_while_refreshing(upstreams):
+    cache = docs_cache(upstreams)
+
+    async def _run():
+        first = await cache.get_merged()
+        fetches = len(upstreams.requests)
+        assert await cache.get_merged() is first
+        assert len(upstreams.requests) == fetches
+
+        upstreams.specs["noise"]["paths"]["/jobs"] = {"get": {}}
+        cache._refreshed_at -= cache.ttl_seconds + 1
+        stale = await cache.get_merged()
+        assert stale is first
+        await cache._refresh_task
+        return first, await cache.get_merged()
+
+    first, refreshed = asyncio.run(_run())
+
+    assert "/noise/jobs" not in merged_paths(first)
+    assert "/noise/jobs" in merged_paths(refreshed)
+
+
+def test_last_good_upstream_docs_are_kept_when_a_fetch_fails(upstreams):
+    cache = docs_cache(upstreams)
+
+    async def _run():
+        await cache.refresh()
+        upstreams.down.add("noise")
+        await cache.refresh()
+        return await cache.get_merged()
+
+    merged = asyncio.run(_run())
+
+    assert "/noise/jobs/{job_id}" in merged_paths(merged)
+    assert cache.service_documents[("noise", "docs")].content == (
+        b"<html>noise docs</html>"
+    )
+
+
+def test_upstream_never_reached_is_left_out(upstreams):
+    upstreams.down.add("stormwater")
+    cache = docs_cache(upstreams)
+
+    async def _run():
+        merged = await cache.get_merged()
+        document = await cache.get_service_document("stormwater", "openapi.json")
+        return merged, document
+
+    merged, document = asyncio.run(_run())
+
+    assert document is None
+    assert "/noise/jobs/{job_id}" in merged_paths(merged)
+    assert not any(path.startswith("/stormwater") for path in merged_paths(merged))
+
+
+@pytest.fixture
+def docs_client(app_client, upstreams, monkeypatch):
+    from cut_api.api import main
+
+    monkeypatch.setattr(main, "DOCS_CACHE", docs_cache(upstreams))
+    return app_client(upstreams.handler)
+
+
+@pytest.mark.parametrize("path", ["/openapi.json", "/noise/openapi.json"])
+def test_docs_revalidate_with_etag(docs_client, upstreams, path):
+    response = docs_client.get(path)
+    assert response.status_code == 200
+    assert "public" in response.headers["Cache-Control"]
+    fetches = len(upstreams.requests)
+
+    revalidated = docs_client.get(
+        path, headers={"If-None-Match": response.headers["ETag"]}
+    )
+
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert len(upstreams.requests) == fetches
+
+
+def test_service_docs_never_cached_are_proxied(docs_client, upstreams):
+    upstreams.down.add("stormwater")
+    docs_client.get("/openapi.json")
+    upstreams.down.clear()
+
+    response = docs_client.get("/stormwater/openapi.json")
+
+    assert response.status_code == 200
+    assert response.json() == service_spec()
+    assert upstreams.requests[-1] == "http://stormwater-api/stormwater/openapi.json"
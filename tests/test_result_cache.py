@@ -0,0 +1,172 @@
+import httpx
+import pytest
+from starlette.requests import Request
+
+from cut_api.caching import (
+    CachedDocument,
+    MemoryLRU,
+    ResultCache,
+    is_final_job_response,
+)
+
+JOB_URL = "http://noise-api/noise/jobs/abc-123"
+
+
+def request_with_headers(headers: dict[str, str]) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        }
+    )
+
+
+def test_only_final_job_responses_are_cacheable():
+    assert is_final_job_response(f"{JOB_URL}/results", 200, b'{"result": {}}')
+    assert not is_final_job_response(f"{JOB_URL}/results", 404, b'{"result": {}}')
+    assert not is_final_job_response(
+        f"{JOB_URL}/results", 200, b'{"status": "running"}'
+    )
+    assert not is_final_job_response(f"{JOB_URL}/results", 200, b"partial")
+    assert is_final_job_response(JOB_URL, 200, b'{"status": "successful"}')
+    assert is_final_job_response(JOB_URL, 200, b'{"status": "failed"}')
+    assert not is_final_job_response(JOB_URL, 200, b'{"status": "running"}')
+    assert not is_final_job_response("http://noise-api/noise/jobs", 200, b"[]")
+
+
+def test_memory_lru_evicts_least_recently_used_by_size():
+    cache = MemoryLRU(max_bytes=10)
+    cache.set("a", CachedDocument.from_content(b"aaaa", "application/json"))
+    cache.set("b", CachedDocument.from_content(b"bbbb", "application/json"))
+    assert cache.get("a")
+
+    cache.set("c", CachedDocument.from_content(b"cccc", "application/json"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    assert cache.size == 8
+
+
+def test_memory_lru_skips_documents_larger_than_budget():
+    cache = MemoryLRU(max_bytes=3)
+    cache.set("a", CachedDocument.from_content(b"aaaa", "application/json"))
+    assert len(cache) == 0
+
+
+def test_cached_document_revalidation():
+    document = CachedDocument.from_content(b'{"result": {}}', "application/json")
+
+    response = document.to_response(request_with_headers({}), "private")
+    assert response.status_code == 200
+    assert response.body == b'{"result": {}}'
+    assert response.headers["etag"] == document.etag
+
+    revalidated = document.to_response(
+        request_with_headers({"If-None-Match": f'"other", {document.etag}'}),
+        "private",
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.body == b""
+
+
+@pytest.fixture
+def result_cache(app_client, fake_redis, monkeypatch):
+    from cut_api.api import main
+
+    result_cache = ResultCache(
+        "redis://localhost:6379/1", ttl_seconds=3600, memory_max_bytes=1024
+    )
+    result_cache.redis = fake_redis
+    monkeypatch.setattr(main, "RESULT_CACHE", result_cache)
+    return result_cache
+
+
+def test_final_job_status_is_served_from_cache(app_client, result_cache):
+    upstream_requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        upstream_requests.append(request)
+        return httpx.Response(200, json={"status": "successful"})
+
+    client = app_client(handler)
+    headers = {"Authorization": "Bearer token"}
+
+    first = client.get("/noise/jobs/abc-123", headers=headers)
+    second = client.get("/noise/jobs/abc-123", headers=headers)
+
+    assert len(upstream_requests) == 1
+    assert second.json() == first.json() == {"status": "successful"}
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert result_cache.redis.data
+
+
+def test_running_job_status_is_not_cached(app_client, result_cache):
+    upstream_requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        upstream_requests.append(request)
+        return httpx.Response(200, json={"status": "running"})
+
+    client = app_client(handler)
+    headers = {"Authorization": "Bearer token"}
+
+    client.get("/noise/jobs/abc-123", headers=headers)
+    response = client.get("/noise/jobs/abc-123", headers=headers)
+
+    assert response.json() == {"status": "running"}
+    assert "ETag" not in response.headers
+    assert len(upstream_requests) == 2
+    assert len(result_cache.memory) == 0
+    assert result_cache.redis.data == {}
+
+
+def job_upstream(upstream_requests, job_status="successful", results=None):
+    def handler(request: httpx.Request) -> httpx.Response:
+        upstream_requests.append(str(request.url))
+        if request.url.path.endswith("/results"):
+            return httpx.Response(200, json=results or {"result": {"geojson": {}}})
+        return httpx.Response(200, json={"status": job_status})
+
+    return handler
+
+
+def test_results_are_cached_once_job_status_was_final(app_client, result_cache):
+    upstream_requests = []
+    client = app_client(job_upstream(upstream_requests))
+    headers = {"Authorization": "Bearer token"}
+
+    client.get("/noise/jobs/abc-123/results", headers=headers)
+    client.get("/noise/jobs/abc-123", headers=headers)
+    client.get("/noise/jobs/abc-123/results", headers=headers)
+    response = client.get("/noise/jobs/abc-123/results", headers=headers)
+
+    assert response.json() == {"result": {"geojson": {}}}
+    assert "immutable" in response.headers["Cache-Control"]
+    assert upstream_requests == [
+        "http://noise-api/noise/jobs/abc-123/results",
+        "http://noise-api/noise/jobs/abc-123",
+        "http://noise-api/noise/jobs/abc-123/results",
+    ]
+
+
+def test_results_without_result_are_not_cached(app_client, result_cache):
+    upstream_requests = []
+    client = app_client(job_upstream(upstream_requests, results={"status": "running"}))
+    headers = {"Authorization": "Bearer token"}
+
+    client.get("/noise/jobs/abc-123", headers=headers)
+    client.get("/noise/jobs/abc-123/results", headers=headers)
+    response = client.get("/noise/jobs/abc-123/results", headers=headers)
+
+    assert response.json() == {"status": "running"}
+    assert "ETag" not in response.headers
+    assert upstream_requests.count("http://noise-api/noise/jobs/abc-123/results") == 2
+
+
+def test_cors_exposes_etag_and_location(app_client, result_cache):
+    client = app_client(job_upstream([]))
+
+    response = client.get("/noise/jobs/abc-123", headers={"Authorization": "Bearer t"})
+
+    exposed = response.headers["Access-Control-Expose-Headers"]
+    assert "ETag" in exposed and "Location" in exposed
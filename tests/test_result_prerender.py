@@ -0,0 +1,112 @@
+import asyncio
+
+import httpx
+import pytest
+from pydantic import ValidationError
+
+from cut_api.api.prerender import ResultPrerenderer
+from cut_api.caching import CachedDocument, MemoryLRU, result_cache_key, result_variant
+from cut_api.config import ResultPrerendering
+
+JOB_URL = "http://noise-api/noise/jobs/abc-123"
+RESULTS_URL = f"{JOB_URL}/results"
+
+
+class MemoryResultCache:
+    def __init__(self):
+        self.memory = MemoryLRU(max_bytes=1024 * 1024)
+
+    async def get(self, key):
+        return self.memory.get(key)
+
+    async def set(self, key, document):
+        self.memory.set(key, document)
+
+
+async def fake_render(results, to_format, size):
+    return f"{to_format}:{size}:{results['result']['geojson']}".encode()
+
+
+def results_upstream(requested):
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(str(request.url))
+        return httpx.Response(200, json={"result": {"geojson": "features"}})
+
+    return lambda **kwargs: httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), **kwargs
+    )
+
+
+def test_result_variant():
+    assert result_variant(None) is None
+    assert result_variant("GeoJSON") == "geojson"
+    assert result_variant("png", "thumbnail") == "png:thumbnail"
+
+
+def test_successful_job_status_prerenders_all_sizes():
+    requested = []
+    cache = MemoryResultCache()
+    prerenderer = ResultPrerenderer(
+        cache,
+        fake_render,
+        sizes=["thumbnail", "full"],
+        timeout_seconds=1,
+        client_factory=results_upstream(requested),
+    )
+
+    async def _run():
+        running = httpx.Response(200, json={"status": "running"})
+        prerenderer.on_job_response(JOB_URL, running)
+        assert not prerenderer._tasks
+
+        successful = httpx.Response(200, json={"status": "successful"})
+        prerenderer.on_job_response(JOB_URL, successful)
+        prerenderer.on_job_response(JOB_URL, successful)
+        await asyncio.gather(*prerenderer._tasks)
+
+    asyncio.run(_run())
+
+    assert requested == [RESULTS_URL]
+    assert cache.memory.get(result_cache_key(RESULTS_URL))
+    thumbnail = cache.memory.get(
+        result_cache_key(RESULTS_URL, result_variant("png", "thumbnail"))
+    )
+    assert thumbnail.content == b"png:thumbnail:features"
+    assert cache.memory.get(
+        result_cache_key(RESULTS_URL, result_variant("png", "full"))
+    )
+
+
+def test_sizes_already_cached_are_not_rendered_again():
+    rendered = []
+
+    async def render(results, to_format, size):
+        rendered.append(size)
+        return await fake_render(results, to_format, size)
+
+    cache = MemoryResultCache()
+    on_demand = CachedDocument.from_content(b"on-demand", "application/json")
+    thumbnail_key = result_cache_key(RESULTS_URL, result_variant("png", "thumbnail"))
+    cache.memory.set(thumbnail_key, on_demand)
+    prerenderer = ResultPrerenderer(
+        cache,
+        render,
+        sizes=["thumbnail", "full"],
+        timeout_seconds=1,
+        client_factory=results_upstream([]),
+    )
+
+    async def _run():
+        prerenderer.schedule(RESULTS_URL)
+        await asyncio.gather(*prerenderer._tasks)
+
+    asyncio.run(_run())
+
+    assert rendered == ["full"]
+    assert cache.memory.get(thumbnail_key) == on_demand
+
+
+def test_prerender_sizes_must_be_png_sizes():
+    assert ResultPrerendering(sizes=["thumbnail"]).sizes == ["thumbnail"]
+    with pytest.raises(ValidationError):
+        ResultPrerendering(sizes=["thumbnail", "poster"])
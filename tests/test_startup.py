@@ -0,0 +1,82 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from tests.env import ENV_EXAMPLE, REPO_ROOT, load_env_example
+
+# Modules that must only be loaded when a conversion is actually requested.
+LAZY_MODULES = ["geopandas", "matplotlib", "pandas", "shapely"]
+
+# Peak RSS of a worker after importing the app. Importing the conversion stack
+# eagerly roughly doubles it.
+MAX_STARTUP_RSS_MB = 100
+
+# Wall time of importing the app, ~0.7s here versus ~1.4s with the conversion
+# stack imported eagerly. Only checked with `pytest -m benchmark`, slow
+# machines can raise it via the environment.
+MAX_STARTUP_IMPORT_TIME_S = float(os.environ.get("MAX_STARTUP_IMPORT_TIME_S", 1.0))
+
+STARTUP_BENCHMARK = f"""
+import json
+import resource
+import sys
+import time
+
+
+def max_rss_mb():
+    # ru_maxrss survives exec on Linux, so a child forked from a large pytest
+    # process would report the parent's peak. Prefer the per-process VmHWM.
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+started = time.perf_counter()
+import cut_api.api.main  # noqa: F401
+import_time = time.perf_counter() - started
+
+print(json.dumps({{
+    "import_time_s": import_time,
+    "max_rss_mb": max_rss_mb(),
+    "loaded_lazy_modules": [m for m in {LAZY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+@pytest.fixture(scope="module")
+def startup_benchmark():
+    env = {**os.environ, **load_env_example(ENV_EXAMPLE)}
+    completed = subprocess.run(
+        [sys.executable, "-c", STARTUP_BENCHMARK],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def test_app_import_does_not_load_conversion_stack(startup_benchmark):
+    assert startup_benchmark["loaded_lazy_modules"] == []
+
+
+def test_app_import_rss_within_budget(startup_benchmark):
+    assert (
+        startup_benchmark["max_rss_mb"] < MAX_STARTUP_RSS_MB
+    ), f"Startup RSS {startup_benchmark['max_rss_mb']:.0f} MB"
+
+
+@pytest.mark.benchmark
+def test_app_import_time_within_budget(startup_benchmark):
+    assert (
+        startup_benchmark["import_time_s"] < MAX_STARTUP_IMPORT_TIME_S
+    ), f"Importing the app took {startup_benchmark['import_time_s']:.2f}s"
@@ -0,0 +1,124 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import jwt
+import pytest
+
+from cut_api.timing import (
+    SlowRequestProfiler,
+    server_timing_header,
+    start_request_timings,
+    timed,
+)
+
+
+def test_timed_accumulates_stages_of_current_request():
+    timings = start_request_timings()
+    with timed("upstream"):
+        time.sleep(0.01)
+    with timed("upstream"):
+        pass
+    with timed("auth"):
+        pass
+
+    assert list(timings) == ["upstream", "auth"]
+    assert timings["upstream"] >= 10
+
+
+def test_server_timing_header():
+    header = server_timing_header({"limiter": 1.234, "upstream": 250.0})
+    assert header == "limiter;dur=1.2, upstream;dur=250.0"
+
+
+def test_profiler_keeps_only_slow_requests():
+    profiler = SlowRequestProfiler(threshold_ms=100, max_profiles=2)
+
+    profiler.finish(profiler.start(), "GET", "/fast", duration_ms=5)
+    assert len(profiler.profiles) == 0
+
+    for path in ["/slow-1", "/slow-2", "/slow-3"]:
+        profiler.finish(profiler.start(), "GET", path, duration_ms=500)
+
+    assert [profile.path for profile in profiler.profiles] == ["/slow-2", "/slow-3"]
+    assert profiler.get(profiler.profiles[0].id).path == "/slow-2"
+
+
+def test_profiler_runs_one_profile_at_a_time():
+    profiler = SlowRequestProfiler(threshold_ms=0, max_profiles=5)
+    profile = profiler.start()
+    assert profiler.start() is None
+    profiler.finish(profile, "GET", "/", duration_ms=1)
+
+    profile = profiler.start()
+    assert profile is not None
+    profiler.finish(profile, "GET", "/", duration_ms=1)
+
+
+def test_request_through_app_reports_server_timing(app_client, monkeypatch):
+    from cut_api.config import settings
+
+    monkeypatch.setattr(settings.profiling, "server_timing_enabled", True)
+    client = app_client(lambda request: httpx.Response(200, json={"status": "running"}))
+
+    response = client.get("/noise/jobs/abc-123", headers={"Authorization": "Bearer t"})
+
+    stages = [
+        metric.split(";")[0].strip()
+        for metric in response.headers["Server-Timing"].split(",")
+    ]
+    assert {"route", "limiter", "auth", "upstream", "total"} <= set(stages)
+
+
+def access_token(email):
+    from cut_api.config import settings
+
+    now = datetime.now(timezone.utc)
+    payload = {
+        "user": {
+            "id": "user-1",
+            "email": email,
+            "restricted": False,
+            "created_at": now.isoformat(),
+        },
+        "iat": int(now.timestamp()),
+        "exp": int((now + timedelta(minutes=5)).timestamp()),
+        "type": "access",
+    }
+    return jwt.encode(payload, settings.auth.token_signing_key, algorithm="HS256")
+
+
+@pytest.fixture
+def admin_client(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from cut_api.api import main
+    from cut_api.config import settings
+
+    monkeypatch.setattr(settings.profiling, "admin_emails", ["admin@example.com"])
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("path", ["/admin/profiles", "/admin/profiles/abc"])
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {},
+        {"Authorization": "Bearer not-a-jwt"},
+        {"Authorization": f"Bearer {access_token('user@example.com')}"},
+    ],
+    ids=["missing-token", "invalid-token", "not-an-admin"],
+)
+def test_admin_profiles_require_an_admin(admin_client, path, headers):
+    response = admin_client.get(path, headers=headers)
+
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+
+
+def test_admin_can_list_profiles(admin_client):
+    headers = {"Authorization": f"Bearer {access_token('admin@example.com')}"}
+
+    assert admin_client.get("/admin/profiles", headers=headers).status_code == 200
+    response = admin_client.get("/admin/profiles/unknown", headers=headers)
+    assert response.status_code == 404